@@ -3,13 +3,247 @@ Aggregation is type of association where one class is composed of one or more in
 Unlike composition, the lifecycle of the contained objects is independent of the container object.
 Aggregation represents a "has-a" relationship.
 """
+from array import array
+from typing import Iterable
+import sys
+import tracemalloc
+
 class Employee:
-    def __init__(self, name: str):
+    def __init__(self, name: str, employee_id: int | None = None):
         self.name = name
-    
+        self.employee_id = employee_id
+
+    # Employees without an id are only ever the same employee as themselves, whatever their name
+    @property
+    def key(self) -> "int | Employee":
+        return self if self.employee_id is None else self.employee_id
+
+    def __eq__(self, other):
+        if not isinstance(other, Employee):
+            return False
+        if self.employee_id is None or other.employee_id is None:
+            return self is other
+        return (self.name, self.employee_id) == (other.name, other.employee_id)
+
+    def __hash__(self):
+        return object.__hash__(self) if self.employee_id is None else hash(self.employee_id)
+
+    def __repr__(self):
+        return f"Employee({self.name!r}, {self.employee_id!r})"
+
 class Department:
-    def __init__(self):
-        self.employees = []
-    
+    """Members indexed by key. A department created by a Roster keeps only the keys and looks its
+    employees up in the roster, so members share the roster's storage (compact or not).
+    """
+    def __init__(self, name: str = "", roster: "Roster | None" = None):
+        self.name = name
+        # key -> Employee, or key -> None when the roster holds the employee
+        self._members: dict[int | Employee, Employee | None] = {}
+        self._roster = roster
+
+    @property
+    def employees(self) -> tuple[Employee, ...]:
+        if self._roster is None:
+            return tuple(self._members.values())
+        return tuple(map(self._roster.get, self._members))
+
+    def __contains__(self, employee: Employee) -> bool:
+        return employee.key in self._members
+
+    def __len__(self):
+        return len(self._members)
+
     def add_employee(self, employee: Employee):
-        self.employees.append(employee)
\ No newline at end of file
+        self.add_employees([employee])
+
+    def add_employees(self, employees: Iterable[Employee]):
+        added: dict[int | Employee, Employee] = {}
+        for employee in employees:
+            if employee.key not in self._members:
+                added.setdefault(employee.key, employee)
+        if self._roster is not None:
+            self._roster._joined(self.name, list(added.values()))
+        for key, employee in added.items():
+            self._members[key] = None if self._roster is not None else employee
+
+    def remove_employee(self, employee: Employee):
+        self.remove_employees([employee])
+
+    def remove_employees(self, employees: Iterable[Employee]):
+        removed = []
+        for employee in employees:
+            if employee.key in self._members:
+                del self._members[employee.key]
+                removed.append(employee)
+        if self._roster is not None:
+            self._roster._left(self.name, removed)
+
+# Compact employee storage - one row per employee in parallel arrays instead of one object each
+class EmployeeTable:
+    """Employee ids and names stored as columns. Names are interned once and rows keep a small integer code.
+
+    Rows are found through an id -> row index; removing an employee moves the last row into its place.
+    Employee objects are created on access and are not kept.
+    """
+    def __init__(self):
+        self._ids = array("q")
+        self._name_codes = array("I")
+        self._names: list[str] = []
+        self._name_index: dict[str, int] = {}
+        self._rows: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, employee_id: int) -> bool:
+        return employee_id in self._rows
+
+    def __iter__(self):
+        names = self._names
+        return (Employee(names[code], employee_id) for employee_id, code in zip(self._ids, self._name_codes))
+
+    def add(self, employee: Employee):
+        if employee.employee_id is None:
+            raise ValueError(f"{employee.name} has no employee_id; EmployeeTable rows are keyed by id")
+        code = self._name_index.get(employee.name)
+        if code is None:
+            code = self._name_index[employee.name] = len(self._names)
+            self._names.append(sys.intern(employee.name))
+        row = self._rows.get(employee.employee_id)
+        if row is None:
+            self._rows[employee.employee_id] = len(self._ids)
+            self._ids.append(employee.employee_id)
+            self._name_codes.append(code)
+        else:
+            self._name_codes[row] = code
+
+    def get(self, employee_id: int) -> Employee | None:
+        row = self._rows.get(employee_id)
+        return None if row is None else Employee(self._names[self._name_codes[row]], employee_id)
+
+    def remove(self, employee_id: int):
+        row = self._rows.pop(employee_id)
+        last_id, last_code = self._ids.pop(), self._name_codes.pop()
+        if row < len(self._ids):
+            self._ids[row], self._name_codes[row] = last_id, last_code
+            self._rows[last_id] = row
+
+class Roster:
+    """All employees of an organization and the departments they belong to.
+
+    Employees are indexed by key (id, or the Employee object itself when it has no id) and by name.
+    Departments created through department() hold only keys and report membership changes back,
+    so departments_of() is a lookup rather than a scan.
+    Removing an employee from the roster takes them out of every department.
+    With compact=True employee records live in an EmployeeTable and every employee needs an id.
+    """
+    def __init__(self, compact: bool = False):
+        self._employees: dict[int | Employee, Employee] | EmployeeTable = EmployeeTable() if compact else {}
+        self._by_name: dict[str, set[int | Employee]] = {}
+        self._departments: dict[str, Department] = {}
+        # Department names per employee as a small tuple; most employees are in very few departments
+        self._memberships: dict[int | Employee, tuple[str, ...]] = {}
+
+    def __len__(self):
+        return len(self._employees)
+
+    def __contains__(self, employee: Employee) -> bool:
+        return employee.key in self._employees
+
+    def add_employees(self, employees: Iterable[Employee]):
+        for employee in employees:
+            previous = self._employees.get(employee.key)
+            if isinstance(self._employees, EmployeeTable):
+                self._employees.add(employee)
+            else:
+                self._employees[employee.key] = employee
+            # Re-adding a key under a new name renames the employee
+            if previous is not None and previous.name != employee.name:
+                self._unindex_name(previous.name, employee.key)
+            self._by_name.setdefault(employee.name, set()).add(employee.key)
+
+    def remove_employees(self, employees: Iterable[Employee]):
+        for employee in employees:
+            for department_name in self._memberships.pop(employee.key, ()):
+                self._departments[department_name]._members.pop(employee.key, None)
+            if isinstance(self._employees, EmployeeTable):
+                self._employees.remove(employee.key)
+            else:
+                del self._employees[employee.key]
+            self._unindex_name(employee.name, employee.key)
+
+    def _unindex_name(self, name: str, key: int | Employee):
+        keys = self._by_name[name]
+        keys.discard(key)
+        if not keys:
+            del self._by_name[name]
+
+    def get(self, key: int | Employee) -> Employee | None:
+        return self._employees.get(key)
+
+    def find_by_name(self, name: str) -> list[Employee]:
+        return [self._employees.get(key) for key in self._by_name.get(name, ())]
+
+    def department(self, name: str) -> Department:
+        department = self._departments.get(name)
+        if department is None:
+            department = self._departments[name] = Department(name, roster=self)
+        return department
+
+    def departments_of(self, employee: Employee) -> list[Department]:
+        return [self._departments[name] for name in self._memberships.get(employee.key, ())]
+
+    def _joined(self, department_name: str, employees: list[Employee]):
+        if isinstance(self._employees, EmployeeTable):
+            # Checked up front so a department never records members the roster could not store
+            for employee in employees:
+                if employee.employee_id is None:
+                    raise ValueError(f"{employee.name} has no employee_id; a compact Roster needs one")
+        for employee in employees:
+            if employee.key not in self._employees:
+                self.add_employees([employee])
+            memberships = self._memberships.get(employee.key, ())
+            if department_name not in memberships:
+                self._memberships[employee.key] = memberships + (department_name,)
+
+    def _left(self, department_name: str, employees: list[Employee]):
+        for employee in employees:
+            memberships = self._memberships.get(employee.key, ())
+            if department_name in memberships:
+                memberships = tuple(name for name in memberships if name != department_name)
+                if memberships:
+                    self._memberships[employee.key] = memberships
+                else:
+                    del self._memberships[employee.key]
+
+def measure_roster_memory(count: int = 200_000) -> dict[str, float]:
+    """Bytes allocated per employee by a Roster of `count` employees, each in one department,
+    with and without the compact table.
+    """
+    def bytes_per_employee(compact: bool) -> float:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        roster = Roster(compact=compact)
+        roster.department("Everyone").add_employees(Employee(f"Employee {index % 1_000}", index) for index in range(count))
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del roster
+        return allocated / count
+
+    return {"objects": bytes_per_employee(False), "compact": bytes_per_employee(True)}
+
+
+if __name__ == "__main__":
+    roster = Roster()
+    alice, bob = Employee("Alice", 1), Employee("Bob", 2)
+    engineering = roster.department("Engineering")
+    engineering.add_employees([alice, bob, alice])
+    roster.department("On-call").add_employee(alice)
+    print(len(engineering), alice in engineering)
+    print(sorted(department.name for department in roster.departments_of(alice)))
+
+    # Alice leaves the company; the Employee object outlives every department they were in
+    roster.remove_employees([alice])
+    print(alice in engineering, roster.departments_of(alice), alice.name)
+
+    print({name: f"{size:.0f} bytes" for name, size in measure_roster_memory().items()})
@@ -1,23 +1,190 @@
 """
 Composition is a "has a" relationship. It is a more restrictive form of aggregation.
 """
+from array import array
+from functools import lru_cache
+from operator import add
+import time
+
+ENGINE_STARTED = "Engine started"
+ENGINE_STOPPED = "Engine stopped"
+
+@lru_cache(maxsize=None)
+def car_message(capacity: str, engine_message: str) -> str:
+    return f"Car with engine {capacity} {engine_message}"
 
 class Engine:
+    __slots__ = ("capacity", "running", "starts")
+
     def __init__(self, capacity):
         self.capacity = capacity
+        self.running = False
+        self.starts = 0
 
     def start(self):
-        return "Engine started"
+        if not self.running:
+            self.running = True
+            self.starts += 1
+        return ENGINE_STARTED
 
     def stop(self):
-        return "Engine stopped" 
-    
+        self.running = False
+        return ENGINE_STOPPED
+
 class Car:
+    __slots__ = ("engine",)
+
     def __init__(self):
         self.engine = Engine("2.0L")
 
     def start(self):
-        return f"Car with engine {self.engine.capacity} {self.engine.start()}"
-    
+        return car_message(self.engine.capacity, self.engine.start())
+
     def stop(self):
-        return f"Car with engine {self.engine.capacity} {self.engine.stop()}"
\ No newline at end of file
+        return car_message(self.engine.capacity, self.engine.stop())
+
+# Fleet - car and engine state of many cars kept in parallel arrays, one entry per car
+_STOPPED = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+class Fleet:
+    """Capacity codes, running flags and start counts for every car, as typed arrays.
+
+    start() and stop() change whole selections (all cars, a slice, or a list of indexes) at once and
+    return how many cars changed state. Indexing a fleet gives a FleetCar, a Car whose engine reads and
+    writes the arrays, so a car behaves the same whether it is used on its own or through its fleet.
+    """
+    def __init__(self, count: int = 0, capacity: str = "2.0L"):
+        self.capacities: list[str] = []
+        self._capacity_codes: dict[str, int] = {}
+        self.capacity_codes = array("B")
+        self.running = bytearray()
+        self.starts = array("I")
+        if count:
+            self.add_cars(count, capacity)
+
+    def __len__(self):
+        return len(self.running)
+
+    def __getitem__(self, index: int) -> "FleetCar":
+        if not -len(self) <= index < len(self):
+            raise IndexError("fleet index out of range")
+        return FleetCar(self, index % len(self))
+
+    def add_cars(self, count: int, capacity: str = "2.0L") -> range:
+        code = self._capacity_codes.get(capacity)
+        if code is None:
+            code = self._capacity_codes[capacity] = len(self.capacities)
+            self.capacities.append(capacity)
+        first = len(self)
+        self.capacity_codes.extend(array("B", [code]) * count)
+        self.running.extend(bytes(count))
+        self.starts.extend(array("I", [0]) * count)
+        return range(first, first + count)
+
+    def select(self, capacity: str) -> list[int]:
+        code = self._capacity_codes.get(capacity)
+        return [index for index, car_code in enumerate(self.capacity_codes) if car_code == code]
+
+    def running_count(self) -> int:
+        return self.running.count(1)
+
+    def start(self, selection: slice | list[int] | None = None) -> int:
+        if selection is None:
+            selection = slice(None)
+        if isinstance(selection, slice):
+            stopped = self.running[selection].translate(_STOPPED)
+            self.starts[selection] = array("I", map(add, self.starts[selection], stopped))
+            self.running[selection] = bytes([1]) * len(stopped)
+            return stopped.count(1)
+        started = 0
+        for index in selection:
+            if not self.running[index]:
+                self.running[index] = 1
+                self.starts[index] += 1
+                started += 1
+        return started
+
+    def stop(self, selection: slice | list[int] | None = None) -> int:
+        if selection is None:
+            selection = slice(None)
+        if isinstance(selection, slice):
+            flags = self.running[selection]
+            self.running[selection] = bytes(len(flags))
+            return flags.count(1)
+        stopped = 0
+        for index in selection:
+            stopped += self.running[index]
+            self.running[index] = 0
+        return stopped
+
+class FleetEngine(Engine):
+    """Engine view onto one car of a Fleet."""
+    __slots__ = ("_fleet", "_index")
+
+    def __init__(self, fleet: Fleet, index: int):
+        self._fleet = fleet
+        self._index = index
+
+    @property
+    def capacity(self) -> str:
+        return self._fleet.capacities[self._fleet.capacity_codes[self._index]]
+
+    @property
+    def running(self) -> bool:
+        return bool(self._fleet.running[self._index])
+
+    @running.setter
+    def running(self, running: bool):
+        self._fleet.running[self._index] = running
+
+    @property
+    def starts(self) -> int:
+        return self._fleet.starts[self._index]
+
+    @starts.setter
+    def starts(self, starts: int):
+        self._fleet.starts[self._index] = starts
+
+class FleetCar(Car):
+    """Car view onto one car of a Fleet."""
+    __slots__ = ("_fleet", "_index")
+
+    def __init__(self, fleet: Fleet, index: int):
+        self._fleet = fleet
+        self._index = index
+
+    @property
+    def engine(self) -> FleetEngine:
+        return FleetEngine(self._fleet, self._index)
+
+def benchmark_fleet(count: int = 1_000_000) -> dict[str, float]:
+    """Seconds to start and then stop `count` cars held as Car objects and as a Fleet."""
+    cars = [Car() for _ in range(count)]
+    started = time.perf_counter()
+    for car in cars:
+        car.start()
+    for car in cars:
+        car.stop()
+    objects = time.perf_counter() - started
+
+    fleet = Fleet(count)
+    started = time.perf_counter()
+    fleet.start()
+    fleet.stop()
+    columnar = time.perf_counter() - started
+
+    assert sum(car.engine.starts for car in cars) == sum(fleet.starts)
+    return {"objects": objects, "fleet": columnar}
+
+
+if __name__ == "__main__":
+    car = Car()
+    print(car.start())
+    print(car.stop())
+
+    fleet = Fleet(3)
+    trucks = fleet.add_cars(2, "5.0L")
+    print(fleet.start(slice(trucks.start, trucks.stop)), fleet.start(), fleet.running_count())
+    print(fleet[3].stop(), fleet[3].engine.running, fleet.starts.tolist())
+
+    print({name: f"{seconds:.3f}s" for name, seconds in benchmark_fleet().items()})
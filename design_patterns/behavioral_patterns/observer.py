@@ -8,6 +8,24 @@ When the weather station updates the weather conditions, all the displays should
 """
 
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from multiprocessing import shared_memory
+from typing import NamedTuple
+import asyncio
+import itertools
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
 
 # Subject Interface
 class Subject(ABC):
@@ -29,28 +47,413 @@ class Observer(ABC):
     def update(self, temperature: float, humidity: float, pressure: float):
         pass
 
+# Dispatcher Interface - decides how (and on which thread) observers are updated
+class NotificationDispatcher(ABC):
+    @abstractmethod
+    def dispatch(self, observers, reading: tuple):
+        pass
+
+    def forget(self, observer):
+        pass
+
+    def close(self):
+        pass
+
+# Concrete Dispatcher - updates every observer on the caller's thread
+class SyncDispatcher(NotificationDispatcher):
+    def dispatch(self, observers, reading: tuple):
+        for observer in observers:
+            observer.update(*reading)
+
+class ObserverMailbox:
+    """Bounded queue of readings for a single observer.
+    At most one drain runs at a time, so every observer sees its readings in order.
+    """
+    def __init__(self, observer, maxsize: int, overflow: str, coalesce: bool, batch_size: int, schedule):
+        # Weak, so a queued reading never keeps a discarded observer alive
+        self._observer = weakref.ref(observer)
+        self.dropped = 0
+        self.errors = 0
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._coalesce = coalesce
+        self._batch_size = batch_size
+        self._schedule = schedule
+        self._pending = deque()
+        self._scheduled = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def close(self):
+        """Drop every queued reading and deliver nothing more, including from a drain already scheduled."""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def put(self, reading: tuple) -> bool:
+        with self._cond:
+            if self._closed:
+                return False
+            if self._coalesce:
+                # A slow observer only ever gets the latest reading
+                self._pending.clear()
+            elif len(self._pending) >= self._maxsize:
+                if self._overflow == "drop":
+                    self.dropped += 1
+                    return False
+                while len(self._pending) >= self._maxsize and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return False
+            self._pending.append(reading)
+            if self._scheduled:
+                return True
+            self._scheduled = True
+        self._schedule(self.drain)
+        return True
+
+    def drain(self):
+        for _ in range(self._batch_size):
+            with self._cond:
+                if self._closed or not self._pending:
+                    self._scheduled = False
+                    self._cond.notify_all()
+                    return
+                reading = self._pending.popleft()
+                self._cond.notify_all()
+            observer = self._observer()
+            if observer is None:
+                with self._cond:
+                    self._pending.clear()
+                continue
+            try:
+                observer.update(*reading)
+            except Exception:
+                self.errors += 1
+        # Batch used up - give the other mailboxes a turn before continuing
+        self._schedule(self.drain)
+
+    def join(self, timeout: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._scheduled, timeout)
+
+# Abstract Dispatcher - one mailbox per observer, drained on some executor
+class QueuedDispatcher(NotificationDispatcher):
+    """Returns from dispatch() as soon as the reading is queued.
+
+    overflow is "drop" (discard readings for a full mailbox) or "block" (wait for room).
+    With coalesce=True each mailbox holds only the newest reading, so overflow never happens.
+    """
+    def __init__(self, queue_size: int = 64, overflow: str = "drop", coalesce: bool = False, batch_size: int = 32):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._coalesce = coalesce
+        self._batch_size = batch_size
+        self._mailboxes = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _schedule(self, drain):
+        pass
+
+    def _mailbox(self, observer) -> ObserverMailbox:
+        mailbox = self._mailboxes.get(observer)
+        if mailbox is None:
+            with self._lock:
+                mailbox = self._mailboxes.get(observer)
+                if mailbox is None:
+                    mailbox = ObserverMailbox(observer, self._queue_size, self._overflow,
+                                              self._coalesce, self._batch_size, self._schedule)
+                    self._mailboxes[observer] = mailbox
+        return mailbox
+
+    def dispatch(self, observers, reading: tuple):
+        for observer in observers:
+            self._mailbox(observer).put(reading)
+
+    def forget(self, observer):
+        with self._lock:
+            mailbox = self._mailboxes.pop(observer, None)
+        if mailbox is not None:
+            mailbox.close()
+
+    def dropped(self) -> int:
+        return sum(mailbox.dropped for mailbox in list(self._mailboxes.values()))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        return all(mailbox.join(timeout) for mailbox in list(self._mailboxes.values()))
+
+# Concrete Dispatcher - delivers on a thread pool
+class ThreadPoolDispatcher(QueuedDispatcher):
+    def __init__(self, max_workers: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="observer")
+
+    def _schedule(self, drain):
+        self._executor.submit(drain)
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+# Concrete Dispatcher - delivers on an asyncio event loop
+class AsyncioDispatcher(QueuedDispatcher):
+    def __init__(self, loop: asyncio.AbstractEventLoop, **kwargs):
+        super().__init__(**kwargs)
+        self._loop = loop
+
+    def _schedule(self, drain):
+        self._loop.call_soon_threadsafe(drain)
+
+    def dispatch(self, observers, reading: tuple):
+        if self._overflow == "block" and not self._coalesce and self._on_loop_thread():
+            # Waiting for room here would stop the very loop that makes room
+            raise RuntimeError("Cannot block on a full mailbox from the event loop thread")
+        super().dispatch(observers, reading)
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+# Shared, fixed-capacity history of readings kept by the subject
+class MeasurementHistory:
+    """Columnar ring buffer: one contiguous array of doubles per field plus timestamps.
+    Aggregates run over whole array slices with C-level builtins rather than per-reading Python objects.
+    A window is either the last N readings (last=N) or every reading at or after a timestamp (since=ts).
+    """
+    FIELDS = ("temperature", "humidity", "pressure")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._columns = {name: array("d", bytes(8 * capacity)) for name in ("timestamp",) + self.FIELDS}
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp: float, temperature: float, humidity: float, pressure: float):
+        i = self._next
+        columns = self._columns
+        columns["timestamp"][i] = timestamp
+        columns["temperature"][i] = temperature
+        columns["humidity"][i] = humidity
+        columns["pressure"][i] = pressure
+        self._next = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _slice(self, name: str, start: int) -> array:
+        # Readings start..newest of a column, oldest first; only that tail is copied
+        column = self._columns[name]
+        oldest = self._next if self._count == self.capacity else 0
+        first = (oldest + start) % self.capacity
+        length = self._count - start
+        if first + length <= self.capacity:
+            return column[first:first + length]
+        return column[first:] + column[:first + length - self.capacity]
+
+    def _position(self, timestamp: float) -> int:
+        # Index (oldest first) of the first reading at or after timestamp, by bisecting the ring's two sorted runs in place
+        timestamps = self._columns["timestamp"]
+        if self._count < self.capacity:
+            return bisect_left(timestamps, timestamp, 0, self._count)
+        oldest = self._next
+        if oldest and timestamp > timestamps[self.capacity - 1]:
+            return self.capacity - oldest + bisect_left(timestamps, timestamp, 0, oldest)
+        return bisect_left(timestamps, timestamp, oldest, self.capacity) - oldest
+
+    def window(self, field: str, last: int | None = None, since: float | None = None) -> array:
+        if field not in self._columns:
+            raise ValueError(f"Unknown field: {field}")
+        start = 0
+        if since is not None:
+            start = self._position(since)
+        if last is not None:
+            start = max(start, self._count - last)
+        return self._slice(field, start)
+
+    def _non_empty(self, field, last, since) -> array:
+        values = self.window(field, last, since)
+        if not values:
+            raise ValueError("No readings in window")
+        return values
+
+    def mean(self, field: str, last: int | None = None, since: float | None = None) -> float:
+        values = self._non_empty(field, last, since)
+        return math.fsum(values) / len(values)
+
+    def min(self, field: str, last: int | None = None, since: float | None = None) -> float:
+        return min(self._non_empty(field, last, since))
+
+    def max(self, field: str, last: int | None = None, since: float | None = None) -> float:
+        return max(self._non_empty(field, last, since))
+
+    def percentile(self, field: str, q: float, last: int | None = None, since: float | None = None) -> float:
+        """Linearly interpolated percentile, q in [0, 100]."""
+        if not 0 <= q <= 100:
+            raise ValueError("q must be between 0 and 100")
+        values = sorted(self._non_empty(field, last, since))
+        rank = (len(values) - 1) * q / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def rolling_mean(self, field: str, size: int, last: int | None = None, since: float | None = None) -> array:
+        """Mean of every run of `size` consecutive readings, computed from a prefix sum."""
+        if size <= 0:
+            raise ValueError("size must be positive")
+        values = self.window(field, last, since)
+        sums = array("d", accumulate(values, initial=0.0))
+        return array("d", ((high - low) / size for high, low in zip(sums[size:], sums)))
+
+class Subscription:
+    """Handle returned by SubscriptionRegistry.subscribe(); cancel() unsubscribes in O(1).
+
+    min_change maps a field name to a threshold: the observer is only notified when at least
+    one of those fields moved by more than its threshold since the last reading it was sent.
+    """
+    FIELDS = {"temperature": 0, "humidity": 1, "pressure": 2}
+
+    def __init__(self, subscription_id: int, registry: "SubscriptionRegistry", observer, weak: bool,
+                 min_change: dict[str, float] | None):
+        self.id = subscription_id
+        self.key = id(observer)
+        self._registry = registry
+        self._strong = None if weak else observer
+        self._ref = weakref.ref(observer, registry._collected(subscription_id)) if weak else None
+        self._thresholds = []
+        for field, threshold in (min_change or {}).items():
+            if field not in self.FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+            self._thresholds.append((self.FIELDS[field], threshold))
+        self._last_sent = None
+
+    @property
+    def observer(self):
+        return self._strong if self._ref is None else self._ref()
+
+    def wants(self, reading: tuple) -> bool:
+        if self._thresholds and self._last_sent is not None:
+            last = self._last_sent
+            if not any(abs(reading[i] - last[i]) > threshold for i, threshold in self._thresholds):
+                return False
+        self._last_sent = reading
+        return True
+
+    def cancel(self):
+        self._registry.unsubscribe(self)
+
+class SubscriptionRegistry:
+    """Observers indexed by subscription id and by identity.
+    Subscribing the same observer twice returns the existing subscription.
+    Observers are held strongly unless subscribed with weak=True; weakly held observers drop out
+    on their own once they are garbage collected.
+    """
+    def __init__(self, on_remove=None):
+        self._subscriptions = {}
+        self._by_observer = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._on_remove = on_remove
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, observer, weak: bool = False, min_change: dict[str, float] | None = None) -> Subscription:
+        with self._lock:
+            existing = self._by_observer.get(id(observer))
+            if existing is not None and existing.observer is observer:
+                return existing
+            subscription = Subscription(next(self._ids), self, observer, weak, min_change)
+            self._subscriptions[subscription.id] = subscription
+            self._by_observer[subscription.key] = subscription
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        observer = subscription.observer
+        self._discard(subscription.id)
+        if observer is not None and self._on_remove is not None:
+            self._on_remove(observer)
+
+    def find(self, observer) -> Subscription | None:
+        subscription = self._by_observer.get(id(observer))
+        if subscription is not None and subscription.observer is observer:
+            return subscription
+        return None
+
+    def select(self, reading: tuple) -> list:
+        """Live observers whose filters accept this reading."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        observers = []
+        for subscription in subscriptions:
+            observer = subscription.observer
+            if observer is not None and subscription.wants(reading):
+                observers.append(observer)
+        return observers
+
+    def _discard(self, subscription_id: int):
+        with self._lock:
+            subscription = self._subscriptions.pop(subscription_id, None)
+            if subscription is not None and self._by_observer.get(subscription.key) is subscription:
+                del self._by_observer[subscription.key]
+
+    def _collected(self, subscription_id: int):
+        registry = weakref.ref(self)
+        def callback(_):
+            live = registry()
+            if live is not None:
+                live._discard(subscription_id)
+        return callback
+
 # Concrete Subject
 class WeatherData(Subject):
-    def __init__(self):
+    def __init__(self, dispatcher: NotificationDispatcher | None = None, history_capacity: int = 0,
+                 recorder: "MeasurementRecorder | None" = None):
         self._temperature = 0.0
         self._humidity = 0.0
         self._pressure = 0.0
-        self._observers = []
-    
+        self._dispatcher = dispatcher or SyncDispatcher()
+        self._observers = SubscriptionRegistry(on_remove=self._dispatcher.forget)
+        self.history = MeasurementHistory(history_capacity) if history_capacity else None
+        self.recorder = recorder
+
+    def subscribe(self, observer, weak: bool = False, min_change: dict[str, float] | None = None) -> Subscription:
+        return self._observers.subscribe(observer, weak, min_change)
+
+    def unsubscribe(self, subscription: Subscription):
+        self._observers.unsubscribe(subscription)
+
     def register_observer(self, observer):
-        self._observers.append(observer)
+        self.subscribe(observer)
     
     def remove_observer(self, observer):
-        self._observers.remove(observer)
+        subscription = self._observers.find(observer)
+        if subscription is None:
+            raise ValueError("Observer is not registered")
+        self._observers.unsubscribe(subscription)
 
     def notify_observers(self):
-        for observer in self._observers:
-            observer.update(self._temperature, self._humidity, self._pressure)
+        reading = (self._temperature, self._humidity, self._pressure)
+        self._dispatcher.dispatch(self._observers.select(reading), reading)
     
     def set_measurements(self, temperature: float, humidity: float, pressure: float):
         self._temperature = temperature
         self._humidity = humidity
         self._pressure = pressure
+        if self.history is not None or self.recorder is not None:
+            timestamp = time.time()
+            if self.history is not None:
+                self.history.append(timestamp, temperature, humidity, pressure)
+            if self.recorder is not None:
+                self.recorder.record(timestamp, temperature, humidity, pressure)
         self.notify_observers()
 
 # Concrete Observer
@@ -71,12 +474,283 @@ class CurrentConditionsDisplay(Observer):
     def display(self):
         print(f"Current Conditions: {self._temperature}F degrees, {self._humidity}% humidity, and {self._pressure} pressure")
 
+class StatisticsDisplay(Observer):
+    def __init__(self, weather_data: WeatherData):
+        if weather_data.history is None:
+            raise ValueError("StatisticsDisplay needs a WeatherData with history enabled")
+        self._weather_data = weather_data
+        self._weather_data.register_observer(self)
+
+    def update(self, temperature: float, humidity: float, pressure: float):
+        self.display()
+
+    def display(self):
+        history = self._weather_data.history
+        print(f"Avg/Max/Min temperature = {history.mean('temperature'):.1f}/"
+              f"{history.max('temperature')}/{history.min('temperature')}")
+
+
+# Cross-process fan-out: readings go through shared memory instead of being pickled
+class SharedMemoryPublisher(Observer):
+    """Writes every reading of a WeatherData into a shared memory ring buffer.
+
+    Layout: a header (capacity, last sequence number) followed by `capacity` slots of
+    (sequence number, temperature, humidity, pressure). A slot's sequence number is zeroed while
+    the slot is rewritten, so readers can tell a fresh slot from a torn or overwritten one.
+    """
+    HEADER = struct.Struct("<QQ")
+    SEQUENCE = struct.Struct("<Q")
+    VALUES = struct.Struct("<ddd")
+    SLOT_SIZE = SEQUENCE.size + VALUES.size
+
+    def __init__(self, weather_data: WeatherData, capacity: int = 4096, name: str | None = None):
+        size = self.HEADER.size + capacity * self.SLOT_SIZE
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self._shm.name
+        self.capacity = capacity
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.HEADER.pack_into(self._shm.buf, 0, capacity, 0)
+        self._weather_data = weather_data
+        weather_data.register_observer(self)
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def update(self, temperature: float, humidity: float, pressure: float):
+        with self._lock:
+            buf = self._shm.buf
+            if buf is None:
+                # Closed while a queued dispatcher still held this reading
+                return
+            sequence = self._sequence + 1
+            offset = self.HEADER.size + (sequence % self.capacity) * self.SLOT_SIZE
+            self.SEQUENCE.pack_into(buf, offset, 0)
+            self.VALUES.pack_into(buf, offset + self.SEQUENCE.size, temperature, humidity, pressure)
+            self.SEQUENCE.pack_into(buf, offset, sequence)
+            self.SEQUENCE.pack_into(buf, self.SEQUENCE.size, sequence)
+            self._sequence = sequence
+
+    def close(self):
+        # Stop receiving readings before the segment goes away
+        try:
+            self._weather_data.remove_observer(self)
+        except ValueError:
+            pass
+        with self._lock:
+            self._shm.close()
+            self._shm.unlink()
+
+class SharedMemorySubscriber:
+    """Reads a SharedMemoryPublisher's ring buffer from another process.
+
+    Readings are replayed into a local WeatherData, so observers in the worker register with
+    `subscriber.weather_data` exactly as they would with the real subject.
+    Reading starts at `from_sequence` (default: the next reading to be published).
+    Readings the publisher overwrote before they were read are counted in `overruns`.
+    """
+    def __init__(self, name: str, from_sequence: int | None = None):
+        self._shm = shared_memory.SharedMemory(name=name)
+        self.capacity, published = SharedMemoryPublisher.HEADER.unpack_from(self._shm.buf, 0)
+        self._next = published + 1 if from_sequence is None else from_sequence
+        self.overruns = 0
+        self.weather_data = WeatherData()
+
+    def _published(self) -> int:
+        return SharedMemoryPublisher.SEQUENCE.unpack_from(self._shm.buf, SharedMemoryPublisher.SEQUENCE.size)[0]
+
+    def lag(self) -> int:
+        return self._published() - self._next + 1
+
+    def poll(self) -> int:
+        """Deliver every reading published since the last poll; returns how many were delivered."""
+        sequence_slot = SharedMemoryPublisher.SEQUENCE
+        values_slot = SharedMemoryPublisher.VALUES
+        slot_size = SharedMemoryPublisher.SLOT_SIZE
+        header_size = SharedMemoryPublisher.HEADER.size
+        buf = self._shm.buf
+        delivered = 0
+        published = self._published()
+        while self._next <= published:
+            oldest = published - self.capacity + 1
+            if self._next < oldest:
+                self.overruns += oldest - self._next
+                self._next = oldest
+            offset = header_size + (self._next % self.capacity) * slot_size
+            stamp = sequence_slot.unpack_from(buf, offset)[0]
+            reading = values_slot.unpack_from(buf, offset + sequence_slot.size)
+            if stamp != self._next or sequence_slot.unpack_from(buf, offset)[0] != stamp:
+                # The publisher lapped us while we were reading this slot
+                published = self._published()
+                continue
+            self._next += 1
+            self.weather_data.set_measurements(*reading)
+            delivered += 1
+        return delivered
+
+    def run(self, stop_event, interval: float = 0.001):
+        while not stop_event.is_set():
+            if not self.poll():
+                time.sleep(interval)
+        self.poll()
+
+    def close(self):
+        self._shm.close()
+
+def run_shared_memory_observer(name: str, observer_class, stop_event, from_sequence: int | None = None):
+    """Process target: attach to a publisher and drive `observer_class(weather_data)` until stopped."""
+    subscriber = SharedMemorySubscriber(name, from_sequence)
+    observer = observer_class(subscriber.weather_data)
+    try:
+        subscriber.run(stop_event)
+    finally:
+        subscriber.close()
+
+
+# Recording and replaying measurement streams
+class MeasurementRecorder:
+    """Appends every reading to a binary log: a magic header, then fixed-width
+    (timestamp, temperature, humidity, pressure) little-endian double records.
+
+    Attach it with WeatherData(recorder=...): set_measurements() records each call itself, with the
+    time it was made, so dispatchers and subscription filters cannot drop or delay readings.
+    """
+    MAGIC = b"WXLOG\x00\x00\x01"
+    RECORD = struct.Struct("<dddd")
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab", buffering=buffer_size)
+        if is_new:
+            self._file.write(self.MAGIC)
+
+    def record(self, timestamp: float, temperature: float, humidity: float, pressure: float):
+        self._file.write(self.RECORD.pack(timestamp, temperature, humidity, pressure))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class MeasurementLog:
+    """Memory-mapped, read-only view of a recorded log. A trailing partial record is ignored."""
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            if file.read(len(MeasurementRecorder.MAGIC)) != MeasurementRecorder.MAGIC:
+                raise ValueError(f"Not a measurement log: {path}")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        record_size = MeasurementRecorder.RECORD.size
+        start = len(MeasurementRecorder.MAGIC)
+        self._count = (len(self._mmap) - start) // record_size
+        self._records = memoryview(self._mmap)[start:start + self._count * record_size]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index: int) -> tuple:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        return MeasurementRecorder.RECORD.unpack_from(self._records, index * MeasurementRecorder.RECORD.size)
+
+    def __iter__(self):
+        return MeasurementRecorder.RECORD.iter_unpack(self._records)
+
+    def close(self):
+        self._records.release()
+        self._mmap.close()
+
+class ReplayStats(NamedTuple):
+    readings: int
+    seconds: float
+
+    @property
+    def readings_per_second(self) -> float:
+        return self.readings / self.seconds if self.seconds else float("inf")
+
+class MeasurementReplayer:
+    """Feeds a recorded log back through WeatherData.set_measurements.
+
+    speed=1.0 keeps the recorded pacing, speed=10.0 plays ten times faster and
+    speed=None plays as fast as the observers can keep up.
+    Do not replay into a WeatherData that is itself being recorded to the same file.
+    """
+    def __init__(self, weather_data: WeatherData):
+        self._weather_data = weather_data
+
+    def replay(self, path: str, speed: float | None = 1.0) -> ReplayStats:
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive")
+        log = MeasurementLog(path)
+        set_measurements = self._weather_data.set_measurements
+        started = time.perf_counter()
+        try:
+            if speed is None:
+                for _, temperature, humidity, pressure in log:
+                    set_measurements(temperature, humidity, pressure)
+            else:
+                first = None
+                for timestamp, temperature, humidity, pressure in log:
+                    if first is None:
+                        first = timestamp
+                    delay = started + (timestamp - first) / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    set_measurements(temperature, humidity, pressure)
+            return ReplayStats(len(log), time.perf_counter() - started)
+        finally:
+            log.close()
+
 
 # Usage
 if __name__ == "__main__":
-    weather_data = WeatherData()
+    weather_data = WeatherData(history_capacity=1024)
     currentDisplay = CurrentConditionsDisplay(weather_data)
+    statisticsDisplay = StatisticsDisplay(weather_data)
 
     weather_data.set_measurements(80, 65, 30.4)
     weather_data.set_measurements(82, 70, 29.2)
-    weather_data.set_measurements(78, 90, 29.2)
\ No newline at end of file
+    weather_data.set_measurements(78, 90, 29.2)
+
+    # Only told about pressure swings larger than 0.5
+    pressureDisplay = CurrentConditionsDisplay(weather_data)
+    weather_data.remove_observer(pressureDisplay)
+    subscription = weather_data.subscribe(pressureDisplay, min_change={"pressure": 0.5})
+    weather_data.set_measurements(79, 90, 29.4)
+    subscription.cancel()
+
+    # The same display, running in a worker process
+    publisher = SharedMemoryPublisher(weather_data, capacity=64)
+    stop_event = multiprocessing.Event()
+    worker = multiprocessing.Process(target=run_shared_memory_observer,
+                                     args=(publisher.name, CurrentConditionsDisplay, stop_event, publisher.sequence + 1))
+    worker.start()
+    weather_data.set_measurements(81, 60, 30.1)
+    stop_event.set()
+    worker.join()
+    publisher.close()
+
+    # Record a stream, then replay it as fast as the observers allow
+    log_path = os.path.join(tempfile.mkdtemp(), "weather.log")
+    recorder = MeasurementRecorder(log_path)
+    recording_data = WeatherData(recorder=recorder)
+    for reading in [(80, 65, 30.4), (82, 70, 29.2), (78, 90, 29.2)]:
+        recording_data.set_measurements(*reading)
+    recorder.close()
+
+    replay_data = WeatherData()
+    replayDisplay = CurrentConditionsDisplay(replay_data)
+    stats = MeasurementReplayer(replay_data).replay(log_path, speed=None)
+    print(f"Replayed {stats.readings} readings at {stats.readings_per_second:.0f} readings/s")
+
+    # set_measurements returns immediately, a slow display only sees the latest reading
+    dispatcher = ThreadPoolDispatcher(max_workers=4, coalesce=True)
+    async_weather_data = WeatherData(dispatcher)
+    asyncDisplay = CurrentConditionsDisplay(async_weather_data)
+
+    async_weather_data.set_measurements(80, 65, 30.4)
+    async_weather_data.set_measurements(82, 70, 29.2)
+    dispatcher.close()
\ No newline at end of file
@@ -9,13 +9,86 @@ There are different types of pizza that can be made with different attributes.
 """
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable
+import copy
+import sys
+import threading
+import tracemalloc
+
+# Every distinct name is stored once; pizzas only keep small integer codes
+class Vocabulary:
+    def __init__(self):
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._combinations: dict[tuple[int, ...], tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    # the name is stored before its code is published, so readers never see a code without a name
+                    self._names.append(sys.intern(name))
+                    code = self._codes[name] = len(self._names) - 1
+        return code
+
+    def name(self, code: int) -> str:
+        return self._names[code]
+
+    def encode(self, names) -> tuple[int, ...]:
+        # identical topping lists share one tuple of codes
+        codes = tuple(self.code(name) for name in names)
+        return self._combinations.setdefault(codes, codes)
+
+    def decode(self, codes: tuple[int, ...]) -> tuple[str, ...]:
+        return tuple(self._names[code] for code in codes)
+
+VOCABULARY = Vocabulary()
+
+class VocabularyField:
+    """A string attribute kept as its vocabulary code in the slot of the same name with a leading underscore."""
+    def __set_name__(self, owner, name: str):
+        self._slot = f"_{name}"
+
+    def __get__(self, pizza, owner=None):
+        if pizza is None:
+            return self
+        return VOCABULARY.name(getattr(pizza, self._slot))
+
+    def __set__(self, pizza, value: str):
+        setattr(pizza, self._slot, VOCABULARY.code(value))
 
 # Product
 class Pizza:
+    __slots__ = ("_name", "_sauce", "_dough", "_toppings")
+
+    name = VocabularyField()
+    sauce = VocabularyField()
+    dough = VocabularyField()
+
     def __init__(self):
+        self.name = ""
         self.sauce = ""
         self.dough = ""
         self.toppings = []
+
+    # Toppings are kept as an immutable tuple of codes, so clones share them until one of them changes its toppings
+    @property
+    def toppings(self) -> tuple[str, ...]:
+        return VOCABULARY.decode(self._toppings)
+
+    @toppings.setter
+    def toppings(self, toppings):
+        self._toppings = VOCABULARY.encode(toppings)
+
+    def add_topping(self, topping: str):
+        self._toppings = VOCABULARY.encode(self.toppings + (topping,))
+
+    def clone(self) -> "Pizza":
+        return copy.copy(self)
     
     def __str__(self):
         return f"{self.name} Pizza with {self.sauce} sauce, {self.dough} dough, and toppings: {', '.join(self.toppings)}"
@@ -45,10 +118,11 @@ class PizzaBuilder(ABC):
 # Concrete Builder
 class HawaiianPizzaBuilder(PizzaBuilder):
     def __init__(self):
-        self._pizza = Pizza()
+        self.reset()
 
     def reset(self):
         self._pizza = Pizza()
+        self._pizza.name = "Hawaiian"
     
     def build_sauce(self):
         self._pizza.sauce = "Tomato"
@@ -65,10 +139,11 @@ class HawaiianPizzaBuilder(PizzaBuilder):
 # Concrete Builder
 class SpicyPizzaBuilder(PizzaBuilder):
     def __init__(self):
-        self._pizza = Pizza()
+        self.reset()
 
     def reset(self):
         self._pizza = Pizza()
+        self._pizza.name = "Spicy"
     
     def build_sauce(self):
         self._pizza.sauce = "Tomato"
@@ -80,26 +155,105 @@ class SpicyPizzaBuilder(PizzaBuilder):
         self._pizza.toppings = ["Pepperoni", "Jalapeno"]
     
     def get_pizza(self) -> Pizza:
-        return
+        return self._pizza
+
+# Prototype cache - repeat orders are cloned from a pizza that was built once
+class PizzaPrototypeCache:
+    """LRU cache of built pizzas keyed by builder type and options. Only clones are handed out."""
+    def __init__(self, max_size: int = 32):
+        self._max_size = max_size
+        self._prototypes: OrderedDict[tuple, Pizza] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, build: Callable[[], Pizza]) -> Pizza:
+        prototype = self._prototypes.get(key)
+        if prototype is None:
+            self.misses += 1
+            # build() may hand back an object its builder still holds, so keep a private copy
+            prototype = self._prototypes[key] = build().clone()
+            if len(self._prototypes) > self._max_size:
+                self._prototypes.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._prototypes.move_to_end(key)
+        return prototype.clone()
 
 # Director
 class Waiter:
-    def __init__(self):
+    def __init__(self, cache: PizzaPrototypeCache | None = None):
         self._builder = None
+        self._cache = cache
+        self._pizza = None
     
     def set_builder(self, builder: PizzaBuilder):
         self._builder = builder
     
-    def construct_pizza(self):
+    def construct_pizza(self, **options):
+        """Build a pizza; options override attributes of the finished pizza, e.g. dough="Thin"."""
+        if self._cache is None:
+            self._pizza = self._build(options)
+            return
+        key = (type(self._builder),) + tuple(
+            (name, tuple(value) if isinstance(value, list) else value) for name, value in sorted(options.items())
+        )
+        self._pizza = self._cache.get(key, lambda: self._build(options))
+
+    def construct_pizzas(self, count: int, **options) -> list[Pizza]:
+        if count < 0:
+            raise ValueError("count must not be negative")
+        if count == 0:
+            return []
+        self.construct_pizza(**options)
+        return [self._pizza] + [self._pizza.clone() for _ in range(count - 1)]
+
+    def _build(self, options: dict) -> Pizza:
         self._builder.reset()
         self._builder.build_sauce()
         self._builder.build_dough()
         self._builder.build_toppings()
+        pizza = self._builder.get_pizza()
+        for name, value in options.items():
+            setattr(pizza, name, value)
+        return pizza
     
     def get_pizza(self) -> Pizza:
-        return self._builder.get_pizza()
+        return self._pizza
     
 
+# Memory benchmark against the original __dict__ + list layout
+class DictPizza:
+    def __init__(self, name: str, sauce: str, dough: str, toppings: list[str]):
+        self.name = name
+        self.sauce = sauce
+        self.dough = dough
+        self.toppings = list(toppings)
+
+def measure_pizza_memory(count: int = 100_000) -> dict[str, float]:
+    """Bytes allocated per pizza for `count` Hawaiian pizzas, before and after the compact layout."""
+    def bytes_per_pizza(make) -> float:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        pizzas = [make() for _ in range(count)]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del pizzas
+        return allocated / count
+
+    builder = HawaiianPizzaBuilder()
+    builder.build_sauce()
+    builder.build_dough()
+    builder.build_toppings()
+    prototype = builder.get_pizza()
+    toppings = list(prototype.toppings)
+    return {
+        "before": bytes_per_pizza(lambda: DictPizza("Hawaiian", "Tomato", "Regular", toppings)),
+        "after": bytes_per_pizza(prototype.clone),
+    }
+
+
 # Client Code
 if __name__ == "__main__":
     waiter = Waiter()
@@ -115,4 +269,17 @@ if __name__ == "__main__":
     waiter.set_builder(spicy_pizza_builder)
     waiter.construct_pizza()
     pizza = waiter.get_pizza()
-    print(pizza)
\ No newline at end of file
+    print(pizza)
+
+    cache = PizzaPrototypeCache(max_size=8)
+    caching_waiter = Waiter(cache)
+    caching_waiter.set_builder(hawaiin_pizza_builder)
+    pizzas = caching_waiter.construct_pizzas(3, dough="Thin")
+    pizzas[0].add_topping("Olives")
+    caching_waiter.construct_pizza(dough="Thin")
+    print(pizzas[0])
+    print(caching_waiter.get_pizza())
+    print(f"Prototype cache: {cache.hits} hits, {cache.misses} misses")
+
+    memory = measure_pizza_memory()
+    print(f"Bytes per pizza: {memory['before']:.0f} before, {memory['after']:.0f} after")
\ No newline at end of file
@@ -1,31 +1,82 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Iterable
 
 class Animal(ABC):
     @abstractmethod
     def speak(self) -> str:
         pass
 
+class AnimalFactory:
+    """Creates animals by registered type name.
+    Stateless animals are registered as shared, so every request for them returns the same flyweight instance.
+    """
+    _registry: dict[str, tuple[Callable[[], Animal], bool]] = {}
+
+    def __init__(self):
+        self._flyweights: dict[str, Animal] = {}
+
+    @classmethod
+    def register(cls, animal_type: str, shared: bool = True):
+        def decorator(animal_class):
+            cls._registry[animal_type] = (animal_class, shared)
+            return animal_class
+        return decorator
+
+    def _lookup(self, animal_type: str) -> tuple[Callable[[], Animal], bool]:
+        try:
+            return self._registry[animal_type]
+        except KeyError:
+            raise ValueError(f"Unknown Animal Found! {animal_type}") from None
+
+    def _flyweight(self, animal_type: str, animal_class: Callable[[], Animal]) -> Animal:
+        animal = self._flyweights.get(animal_type)
+        if animal is None:
+            animal = self._flyweights[animal_type] = animal_class()
+        return animal
+
+    def create_animals(self, animal_type: str) -> Animal:
+        animal_class, shared = self._lookup(animal_type)
+        if shared:
+            return self._flyweight(animal_type, animal_class)
+        return animal_class()
+
+    def create_many(self, animal_types: Iterable[str]) -> list[Animal]:
+        """Create one animal per type name, resolving each distinct type only once."""
+        animal_types = list(animal_types)
+        positions: dict[str, list[int]] = {}
+        for index, animal_type in enumerate(animal_types):
+            positions.setdefault(animal_type, []).append(index)
+
+        animals: list[Animal] = [None] * len(animal_types)
+        for animal_type, indexes in positions.items():
+            animal_class, shared = self._lookup(animal_type)
+            if shared:
+                animal = self._flyweight(animal_type, animal_class)
+                for index in indexes:
+                    animals[index] = animal
+            else:
+                for index in indexes:
+                    animals[index] = animal_class()
+        return animals
+
+@AnimalFactory.register("Dog")
 class Dog(Animal):
     def speak(self) -> str:
         return "Woof!"
-    
+
+@AnimalFactory.register("Cat")
 class Cat(Animal):
     def speak(self) -> str:
         return "Meow!"
-    
-class AnimalFactory:
-    def create_animals(self, animal_type: str) -> Animal:
-        if animal_type == "Dog":
-            return Dog()
-        elif animal_type == "Cat":
-            return Cat()
-        else:
-            return ValueError(f"Unknown Animal Found! {animal_type}")
-        
+
 
 # Usage
-factory = AnimalFactory()
-dog = factory.create_animals("Dog")
-cat = factory.create_animals("Cat")
-print(dog.speak())
-print(cat.speak())
\ No newline at end of file
+if __name__ == "__main__":
+    factory = AnimalFactory()
+    dog = factory.create_animals("Dog")
+    cat = factory.create_animals("Cat")
+    print(dog.speak())
+    print(cat.speak())
+
+    animals = factory.create_many(["Dog", "Cat", "Dog"])
+    print([animal.speak() for animal in animals])
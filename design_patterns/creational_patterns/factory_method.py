@@ -6,15 +6,81 @@ Example:
 There are different types of pizza. Each type of pizza is made in a different way.
 """
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Iterable
+import queue
+import sys
+import threading
+import time
+
+# Every distinct name is stored once; pizzas only keep small integer codes
+class Vocabulary:
+    def __init__(self):
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._combinations: dict[tuple[int, ...], tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    # the name is stored before its code is published, so readers never see a code without a name
+                    self._names.append(sys.intern(name))
+                    code = self._codes[name] = len(self._names) - 1
+        return code
+
+    def name(self, code: int) -> str:
+        return self._names[code]
+
+    def encode(self, names) -> tuple[int, ...]:
+        # identical topping lists share one tuple of codes
+        codes = tuple(self.code(name) for name in names)
+        return self._combinations.setdefault(codes, codes)
+
+    def decode(self, codes: tuple[int, ...]) -> tuple[str, ...]:
+        return tuple(self._names[code] for code in codes)
+
+VOCABULARY = Vocabulary()
+
+class VocabularyField:
+    """A string attribute kept as its vocabulary code in the slot of the same name with a leading underscore."""
+    def __set_name__(self, owner, name: str):
+        self._slot = f"_{name}"
+
+    def __get__(self, pizza, owner=None):
+        if pizza is None:
+            return self
+        return VOCABULARY.name(getattr(pizza, self._slot))
+
+    def __set__(self, pizza, value: str):
+        setattr(pizza, self._slot, VOCABULARY.code(value))
 
 # Product
 class Pizza(ABC):
+    # Subclasses declare __slots__ = () so pizzas never get a per-instance __dict__
+    __slots__ = ("_name", "_sauce", "_dough", "_toppings")
+
+    name = VocabularyField()
+    sauce = VocabularyField()
+    dough = VocabularyField()
+
     def __init__(self):
         self.name = ""
         self.sauce = ""
         self.dough = ""
         self.toppings = []
 
+    @property
+    def toppings(self) -> tuple[str, ...]:
+        return VOCABULARY.decode(self._toppings)
+
+    @toppings.setter
+    def toppings(self, toppings):
+        self._toppings = VOCABULARY.encode(toppings)
+
     def prepare(self):
         print("Preparing Pizza")
         print(f"Adding {self.sauce} sauce")
@@ -34,6 +100,8 @@ class Pizza(ABC):
 
 # Concrete Products
 class NYStyleCheesePizza(Pizza):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "Cheese Pizza"
@@ -42,6 +110,8 @@ class NYStyleCheesePizza(Pizza):
         self.toppings = ["Mozzarella", "Parmesan"]
 
 class ChicagoStyleCheesePizza(Pizza):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "Cheese Pizza"
@@ -85,6 +155,114 @@ class ChicagoPizzaStore(PizzaStore):
                 raise ValueError(f"Unknown Pizza Type: {pizza_type}")
             
 
+# Pipelined ordering - every step runs on its own workers, so a slow bake overlaps with other orders
+class PizzaOrder:
+    def __init__(self, pizza_type: str):
+        self.pizza_type = pizza_type
+        self.pizza = None
+        self.future = Future()
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+
+    @property
+    def average_latency(self) -> float:
+        return self.busy_seconds / self.processed if self.processed else 0.0
+
+class PizzaOrderPipeline:
+    """Runs create_pizza -> prepare -> bake -> cut -> box for a stream of orders.
+
+    Each stage has its own worker threads and a bounded queue in front of it; a full queue
+    blocks the stage feeding it, so a slow stage pushes back instead of piling up orders.
+    Works with any PizzaStore, since stages only call create_pizza and the Pizza steps.
+    """
+    STAGES = ("create", "prepare", "bake", "cut", "box")
+
+    def __init__(self, store: PizzaStore, workers: dict[str, int] | None = None, queue_size: int = 16):
+        workers = workers or {}
+        self._store = store
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in self.STAGES]
+        self._stats = [StageStats(stage) for stage in self.STAGES]
+        self._workers = []
+        self._closed = False
+        # Held across the closed check and the enqueue, so no order can land behind the shutdown sentinels
+        self._submit_lock = threading.Lock()
+        for index, stage in enumerate(self.STAGES):
+            threads = [threading.Thread(target=self._work, args=(index,), name=f"pizza-{stage}", daemon=True)
+                       for _ in range(workers.get(stage, 1))]
+            for thread in threads:
+                thread.start()
+            self._workers.append(threads)
+
+    def _run_stage(self, stage: str, order: PizzaOrder):
+        if stage == "create":
+            order.pizza = self._store.create_pizza(order.pizza_type)
+        else:
+            getattr(order.pizza, stage)()
+
+    def _work(self, index: int):
+        stage = self.STAGES[index]
+        inbox = self._queues[index]
+        is_last = index == len(self.STAGES) - 1
+        while True:
+            order = inbox.get()
+            if order is None:
+                return
+            if index == 0 and not order.future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                self._run_stage(stage, order)
+            except Exception as error:
+                order.future.set_exception(error)
+                continue
+            finally:
+                self._stats[index].record(time.perf_counter() - started)
+            if is_last:
+                order.future.set_result(order.pizza)
+            else:
+                self._queues[index + 1].put(order)
+
+    def submit(self, pizza_type: str) -> Future:
+        order = PizzaOrder(pizza_type)
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Pipeline is shut down")
+            self._queues[0].put(order)
+        return order.future
+
+    def submit_many(self, pizza_types: Iterable[str]) -> list[Future]:
+        return [self.submit(pizza_type) for pizza_type in pizza_types]
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {
+            stats.name: {"queue_depth": inbox.qsize(), "processed": stats.processed, "average_latency": stats.average_latency}
+            for stats, inbox in zip(self._stats, self._queues)
+        }
+
+    def shutdown(self):
+        """Finish every submitted order, then stop the workers stage by stage."""
+        with self._submit_lock:
+            self._closed = True
+            for _ in self._workers[0]:
+                self._queues[0].put(None)
+        for index, (inbox, threads) in enumerate(zip(self._queues, self._workers)):
+            if index:
+                for _ in threads:
+                    inbox.put(None)
+            for thread in threads:
+                thread.join()
+
+
 # Usage
 if __name__ == "__main__":
     ny_store = NYPizzaStore()
@@ -96,4 +274,10 @@ if __name__ == "__main__":
     pizza = chicago_store.order_pizza("Cheese")
     print(f"Ordered a {pizza.name}\n")
 
+    pipeline = PizzaOrderPipeline(ny_store, workers={"bake": 4})
+    futures = pipeline.submit_many(["Cheese"] * 4)
+    pizzas = [future.result() for future in futures]
+    pipeline.shutdown()
+    print(f"Ordered {len(pizzas)} pizzas through the pipeline, bake stage: {pipeline.stats()['bake']}\n")
+
 
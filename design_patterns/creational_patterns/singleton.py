@@ -1,23 +1,145 @@
 # generally implemented by private constructor and a public method
-# metaclasses define the behavior of classes 
+# metaclasses define the behavior of classes
 
-from typing import Any
+from typing import Any, Callable
+import functools
+import os
 import threading
+import time
+import weakref
 
 
 class Singleton:
     _instance: Any = None
     _lock: threading.Lock = threading.Lock() # prevents race condition
+    _init_lock: threading.RLock = threading.RLock() # first __init__ runs once, re-entrant for nested construction
+    _reset_on_fork: bool = True
 
-    def __new__(cls):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # every subclass gets its own instance and lock instead of sharing the parent's
+        cls._instance = None
+        cls._lock = threading.Lock()
+        cls._init_lock = threading.RLock()
+        _singleton_classes.add(cls)
+
+        # __init__ runs only for the call that created the instance
+        init = cls.__dict__.get("__init__")
+        if init is not None:
+            @functools.wraps(init)
+            def __init__(self, *args, **kwargs):
+                if self.__dict__.get("_initialized"):
+                    return
+                with type(self)._init_lock:
+                    if self.__dict__.get("_initialized"):
+                        return
+                    init(self, *args, **kwargs)
+                    self._initialized = True
+            cls.__init__ = __init__
+
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
 
         return cls._instance
-    
+
     def __init__(self):
         pass
 
 
+_singleton_classes = weakref.WeakSet([Singleton])
+
+def _reset_singletons_after_fork():
+    # instances created in the parent (connections, caches) must not leak into the child
+    for cls in list(_singleton_classes):
+        if cls._reset_on_fork:
+            cls._instance = None
+        cls._lock = threading.Lock()
+        cls._init_lock = threading.RLock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_singletons_after_fork)
+
+
+class ServiceRegistry(Singleton):
+    """Process-wide registry of lazily created services, one instance per key.
+
+    get() is lock-free once a service exists. The first get() for a key takes only that key's lock,
+    so slow initialisers for different keys do not wait on each other.
+    After os.fork() the child starts with no instances and re-creates services on first use,
+    unless they were registered with reinit_on_fork=False.
+    """
+    # the registry itself (and its registrations) survives a fork, only the services are reset
+    _reset_on_fork = False
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._inherit_on_fork: set[str] = set()
+        self._instances: dict[str, Any] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self.init_timings: dict[str, float] = {}
+        if hasattr(os, "register_at_fork"):
+            registry = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: registry() and registry()._after_fork())
+
+    def register(self, key: str, factory: Callable[[], Any], reinit_on_fork: bool = True):
+        self._factories[key] = factory
+        self._locks.setdefault(key, threading.Lock())
+        if not reinit_on_fork:
+            self._inherit_on_fork.add(key)
+
+    def get(self, key: str) -> Any:
+        try:
+            return self._instances[key]
+        except KeyError:
+            return self._create(key)
+
+    def _create(self, key: str) -> Any:
+        if key not in self._factories:
+            raise KeyError(f"No service registered for {key!r}")
+        with self._locks[key]:
+            if key in self._instances:
+                return self._instances[key]
+            started = time.perf_counter()
+            instance = self._factories[key]()
+            self.init_timings[key] = time.perf_counter() - started
+            self._instances[key] = instance
+            return instance
+
+    def warm_up(self, keys: list[str] | None = None, background: bool = False) -> threading.Thread | None:
+        """Create services ahead of their first get(); init times end up in init_timings."""
+        keys = list(self._factories) if keys is None else keys
+        if not background:
+            for key in keys:
+                self.get(key)
+            return None
+        thread = threading.Thread(target=lambda: [self.get(key) for key in keys], name="service-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def reset(self, key: str | None = None):
+        if key is None:
+            self._instances.clear()
+            self.init_timings.clear()
+        else:
+            self._instances.pop(key, None)
+            self.init_timings.pop(key, None)
+
+    def _after_fork(self):
+        self._locks = {key: threading.Lock() for key in self._factories}
+        self._instances = {key: value for key, value in self._instances.items() if key in self._inherit_on_fork}
+        self.init_timings = {key: value for key, value in self.init_timings.items() if key in self._inherit_on_fork}
+
+
+# Usage
+if __name__ == "__main__":
+    registry = ServiceRegistry()
+    registry.register("cache", dict)
+    registry.register("connection", lambda: time.sleep(0.1) or object())
+    registry.warm_up(background=True).join()
+
+    print(registry is ServiceRegistry())
+    print(registry.get("cache") is ServiceRegistry().get("cache"))
+    print(registry.init_timings)
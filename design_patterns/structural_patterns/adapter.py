@@ -10,38 +10,420 @@ Payment Gateway B has a method send_payment() that accepts a payment amount.
 """
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable
+from urllib.parse import urlsplit
+import asyncio
+import http.client
+import json
+import queue
+import statistics
+import threading
+import time
+import uuid
+
+class PaymentError(Exception):
+    pass
+
+class PaymentDeclined(PaymentError):
+    """The gateway answered and refused the payment, so nothing was charged."""
+
+@dataclass
+class PaymentResult:
+    amount: float
+    succeeded: bool
+    response: Any = None
+    error: Exception | None = None
 
 # Target Interface
 class PaymentProcessor(ABC):
+    # Retrying with the same idempotency_key must never charge twice
     @abstractmethod
-    def process_payment(self, amount: float):
+    def process_payment(self, amount: float, idempotency_key: str | None = None):
         pass
 
+    def _try_payment(self, amount: float) -> PaymentResult:
+        try:
+            return PaymentResult(amount, True, self.process_payment(amount))
+        except Exception as error:
+            return PaymentResult(amount, False, error=error)
+
+    def process_payments(self, amounts: Iterable[float], max_concurrency: int = 8) -> list[PaymentResult]:
+        """Process many payments with at most max_concurrency in flight. One result per amount, in order."""
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(self._try_payment, amounts))
+
+    async def process_payments_async(self, amounts: Iterable[float], max_concurrency: int = 8) -> list[PaymentResult]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def pay(amount: float) -> PaymentResult:
+            async with semaphore:
+                return await asyncio.to_thread(self._try_payment, amount)
+
+        return await asyncio.gather(*(pay(amount) for amount in amounts))
+
 # Concrete Target - Payment Gateway A (Existing System)
 class StripePaymentProcessor(PaymentProcessor):
-    def process_payment(self, amount: float):
+    def process_payment(self, amount: float, idempotency_key: str | None = None):
         print(f"Processing payment of ${amount} using Stripe")
 
+# Keep-alive HTTP connections to one host, reused across requests
+class HTTPConnectionPool:
+    def __init__(self, host: str, port: int, size: int = 8, timeout: float = 10.0):
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None) -> tuple[int, bytes]:
+        with self._slots:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            headers = headers or {}
+            # Once a request has been sent, a dropped connection does not tell whether the server acted on it
+            can_resend = method in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE") or "Idempotency-Key" in headers
+            while True:
+                sent = False
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    sent = True
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (ConnectionError, http.client.HTTPException):
+                    connection.close()
+                    if not reused or (sent and not can_resend):
+                        raise
+                    # The server may have dropped an idle connection - retry once on a fresh one
+                    connection, reused = self._connect(), False
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.put(connection)
+            return response.status, data
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
 # Adaptee - Payment Gateway B (New System)
 class PayPalPaymentGateway:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, endpoint: str | None = None, pool_size: int = 8):
         self.api_key = api_key
+        self._pool = None
+        if endpoint is not None:
+            url = urlsplit(endpoint)
+            self._pool = HTTPConnectionPool(url.hostname, url.port or 80, size=pool_size)
     
-    def send_payment(self, amount: float):
-        print(f"Sending payment of ${amount} using PayPal")
+    def send_payment(self, amount: float, idempotency_key: str | None = None):
+        if self._pool is None:
+            print(f"Sending payment of ${amount} using PayPal")
+            return None
+        body = json.dumps({"amount": amount}).encode()
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"}
+        if idempotency_key is not None:
+            headers["Idempotency-Key"] = idempotency_key
+        status, data = self._pool.request("POST", "/payments", body, headers)
+        if 400 <= status < 500:
+            raise PaymentDeclined(f"PayPal declined payment of ${amount}: {status} {data.decode()}")
+        if status != 200:
+            raise PaymentError(f"PayPal rejected payment of ${amount}: {status} {data.decode()}")
+        return json.loads(data)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
 
 # Adapter
 class PayPalPaymentAdapter(PaymentProcessor):
     def __init__(self, paypal_payment_gateway: PayPalPaymentGateway):
         self.paypal_payment_gateway = paypal_payment_gateway
     
-    def process_payment(self, amount: float):
-        self.paypal_payment_gateway.send_payment(amount)
+    def process_payment(self, amount: float, idempotency_key: str | None = None):
+        return self.paypal_payment_gateway.send_payment(amount, idempotency_key)
+
+# Rolling health of one backend, with a circuit breaker
+class BackendHealth:
+    """Tracks the last `window` latencies and outcomes of a backend.
+
+    Outcomes are transport errors and server errors; declined payments count as successes.
+    The breaker opens when the error rate over at least `min_requests` calls reaches
+    `failure_threshold`. After `cooldown` seconds one probe request is let through:
+    success closes the breaker, failure opens it again.
+    """
+    def __init__(self, window: int = 50, failure_threshold: float = 0.5, min_requests: int = 5, cooldown: float = 5.0):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._failure_threshold = failure_threshold
+        self._min_requests = min_requests
+        self._cooldown = cooldown
+        self._opened_at = None
+        self._probing = False
+        self._in_flight: list[float] = []
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self._cooldown:
+            return "half-open"
+        return "open"
+
+    @property
+    def error_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def measured_latency(self) -> float | None:
+        return statistics.median(self._latencies) if self._latencies else None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def expected_latency(self, prior: float = 0.0) -> float:
+        """Median latency, or `prior` before anything was measured; never less than the age of the oldest call still running."""
+        measured = self.measured_latency
+        expected = prior if measured is None else measured
+        with self._lock:
+            oldest = min(self._in_flight, default=None)
+        return expected if oldest is None else max(expected, time.monotonic() - oldest)
+
+    def begin(self) -> float:
+        started = time.monotonic()
+        with self._lock:
+            self._in_flight.append(started)
+        return started
+
+    def acquire(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, latency: float, succeeded: bool, started: float | None = None):
+        with self._lock:
+            if started is not None:
+                self._in_flight.remove(started)
+            self._latencies.append(latency)
+            self._outcomes.append(succeeded)
+            if self._probing:
+                self._probing = False
+                if succeeded:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+            elif (self._opened_at is None and len(self._outcomes) >= self._min_requests
+                  and self.error_rate >= self._failure_threshold):
+                self._opened_at = time.monotonic()
+
+# Routes each payment to the fastest healthy backend
+class RoutingPaymentProcessor(PaymentProcessor):
+    """Sends payments to the backend with the lowest expected latency whose breaker allows it.
+
+    Backends in the same idempotency domain (e.g. regions of one gateway) share idempotency state,
+    so sending them the same key charges at most once. Backends not named in `idempotency_domains`
+    are each their own domain. Once an attempt may have charged - it is still running, or failed
+    after the request could have reached the gateway - the payment only goes on to backends in that
+    attempt's domain. A declined or refused attempt fails over to any backend.
+
+    With hedge_after set, a second backend of the same domain is tried if the first has not answered
+    within that many seconds, and the first answer wins. The gateway answers the later attempt with
+    the same charge; such answers are counted in `duplicate_successes`.
+    Calls repeated with a key that already succeeded return the stored result.
+    """
+    def __init__(self, backends: dict[str, PaymentProcessor], hedge_after: float | None = None,
+                 idempotency_domains: dict[str, str] | None = None,
+                 max_workers: int = 16, remembered_keys: int = 100_000, **health_options):
+        self._backends = backends
+        self._domains = {name: (idempotency_domains or {}).get(name, name) for name in backends}
+        self.health = {name: BackendHealth(**health_options) for name in backends}
+        self._hedge_after = hedge_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="payment-route")
+        self._results: OrderedDict[str, Future] = OrderedDict()
+        self._remembered_keys = remembered_keys
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.duplicate_successes = 0
+
+    def process_payment(self, amount: float, idempotency_key: str | None = None):
+        key = idempotency_key or uuid.uuid4().hex
+        with self._lock:
+            result = self._results.get(key)
+            is_owner = result is None
+            if is_owner:
+                result = self._results[key] = Future()
+                if len(self._results) > self._remembered_keys:
+                    self._results.popitem(last=False)
+        if not is_owner:
+            # Same key in flight or already settled - never charge it again
+            return result.result()
+        try:
+            response = self._route(amount, key)
+        except Exception as error:
+            with self._lock:
+                self._results.pop(key, None)
+            result.set_exception(error)
+            raise
+        result.set_result(response)
+        return response
+
+    def _ranked(self) -> list[str]:
+        candidates = [name for name, health in self.health.items() if health.state != "open"]
+        # Unmeasured backends are assumed to be as slow as the slowest measured one, and win ties so they get measured
+        prior = max((latency for health in self.health.values() if (latency := health.measured_latency) is not None),
+                    default=0.0)
+        return sorted(candidates, key=lambda name: (self.health[name].expected_latency(prior), self.health[name].in_flight,
+                                                    self.health[name].measured_latency is not None))
+
+    def _attempt(self, name: str, amount: float, key: str):
+        health = self.health[name]
+        started = health.begin()
+        try:
+            response = self._backends[name].process_payment(amount, key)
+        except PaymentDeclined:
+            # A refused payment is a healthy answer, so it must not count towards the breaker
+            health.record(time.monotonic() - started, True, started)
+            raise
+        except Exception:
+            health.record(time.monotonic() - started, False, started)
+            raise
+        health.record(time.monotonic() - started, True, started)
+        return response
+
+    def _launch(self, candidates: list[str], pending: dict, amount: float, key: str, domain: str | None) -> bool:
+        for name in list(candidates):
+            if domain is not None and self._domains[name] != domain:
+                continue
+            candidates.remove(name)
+            if self.health[name].acquire():
+                pending[self._executor.submit(self._attempt, name, amount, key)] = name
+                return True
+        return False
+
+    def _route(self, amount: float, key: str):
+        candidates = self._ranked()
+        pending: dict[Future, str] = {}
+        errors = []
+        # Domain the payment is bound to once an attempt may have charged
+        domain = None
+        maybe_charged = False
+        if not self._launch(candidates, pending, amount, key, domain):
+            raise PaymentError("No healthy payment backend available")
+        while pending:
+            domain = domain or self._domains[next(iter(pending.values()))]
+            can_hedge = self._hedge_after is not None and len(pending) == 1 and candidates
+            done, _ = wait(pending, timeout=self._hedge_after if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                if self._launch(candidates, pending, amount, key, domain):
+                    self.hedged += 1
+                continue
+            for future in done:
+                name = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    for loser in pending:
+                        loser.add_done_callback(self._count_duplicate)
+                    return future.result()
+                errors.append(f"{name}: {error}")
+                maybe_charged = maybe_charged or not isinstance(error, (PaymentDeclined, ConnectionRefusedError))
+            if not pending and not maybe_charged:
+                # Every attempt so far was refused outright, so nothing was charged
+                domain = None
+            if not pending:
+                self._launch(candidates, pending, amount, key, domain)
+        raise PaymentError(f"Payment of ${amount} failed on every backend: {'; '.join(errors)}")
+
+    def _count_duplicate(self, future: Future):
+        if future.exception() is None:
+            with self._lock:
+                self.duplicate_successes += 1
+
+    def close(self):
+        self._executor.shutdown(wait=True)
 
 # Client Code
 def process_payment(payment_processor: PaymentProcessor, amount: float):
     payment_processor.process_payment(amount)
 
+# Stand-in payment gateway on localhost, for exercising the pooled client without a real provider
+class LocalPaymentGatewayServer:
+    # Servers created with shared_with act as regions of one gateway: they share payments and idempotency keys
+    def __init__(self, latency: float = 0.0, shared_with: "LocalPaymentGatewayServer | None" = None):
+        if shared_with is None:
+            self.payments: list[float] = []
+            self._responses: dict[str, dict] = {}
+            self._lock = threading.Lock()
+        else:
+            self.payments, self._responses, self._lock = shared_with.payments, shared_with._responses, shared_with._lock
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                amount = payload.get("amount", 0)
+                time.sleep(latency)
+                if amount <= 0:
+                    self._reply(400, {"error": "amount must be positive"})
+                    return
+                key = self.headers.get("Idempotency-Key")
+                with server._lock:
+                    response = server._responses.get(key) if key else None
+                    if response is None:
+                        server.payments.append(amount)
+                        response = {"id": len(server.payments), "amount": amount}
+                        if key:
+                            server._responses[key] = response
+                self._reply(200, response)
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
 # Usage
 if __name__ == "__main__":
     stripe_payment_processor = StripePaymentProcessor()
@@ -49,4 +431,36 @@ if __name__ == "__main__":
 
     paypal_payment_gateway = PayPalPaymentGateway("api_key")
     paypal_payment_adapter = PayPalPaymentAdapter(paypal_payment_gateway)
-    process_payment(paypal_payment_adapter, 200.0)
\ No newline at end of file
+    process_payment(paypal_payment_adapter, 200.0)
+
+    # Batched payments over pooled connections to a local stand-in gateway
+    gateway_server = LocalPaymentGatewayServer(latency=0.01)
+    gateway_server.start()
+    pooled_gateway = PayPalPaymentGateway("api_key", endpoint=gateway_server.endpoint, pool_size=4)
+    pooled_adapter = PayPalPaymentAdapter(pooled_gateway)
+
+    results = pooled_adapter.process_payments([10.0, 20.0, -5.0, 30.0], max_concurrency=4)
+    print([result.succeeded for result in results])
+    results = asyncio.run(pooled_adapter.process_payments_async([float(amount) for amount in range(1, 21)]))
+    print(f"{sum(result.succeeded for result in results)} async payments settled")
+
+    # Two regions of the same gateway behind a latency-aware router
+    slow_region = LocalPaymentGatewayServer(latency=0.2, shared_with=gateway_server)
+    slow_region.start()
+    slow_gateway = PayPalPaymentGateway("api_key", endpoint=slow_region.endpoint)
+    router = RoutingPaymentProcessor(
+        {"fast": pooled_adapter, "slow": PayPalPaymentAdapter(slow_gateway)}, hedge_after=0.05,
+        idempotency_domains={"fast": "paypal", "slow": "paypal"},
+    )
+    charges_before = len(gateway_server.payments)
+    for _ in range(5):
+        router.process_payment(25.0)
+    print(router.process_payment(50.0, idempotency_key="order-42") == router.process_payment(50.0, idempotency_key="order-42"))
+    print(f"6 routed payments, {len(gateway_server.payments) - charges_before} charges, {router.hedged} hedged")
+    print({name: (health.state, round(health.expected_latency(), 3)) for name, health in router.health.items()})
+    router.close()
+    slow_gateway.close()
+    slow_region.stop()
+
+    pooled_gateway.close()
+    gateway_server.stop()
\ No newline at end of file
@@ -19,26 +19,446 @@ class NotificationService:
 
 # Adhering to the Dependency Inversion Principle
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Iterable, NamedTuple
+import asyncio
+import hashlib
+import math
+import smtplib
+import socketserver
+import threading
+import time
+
+class Notification(NamedTuple):
+    message: str
+    recipient: str | None = None
 
 class NotificationSender(ABC):
     @abstractmethod
-    def send(self, message: str):
+    def send(self, message: str, recipient: str | None = None):
         pass
 
+    def send_batch(self, notifications: list[Notification]) -> list[Exception | None]:
+        """Send several notifications at once and return, per notification, the error that stopped it or None.
+        Senders with a cheaper bulk path (one connection, one request) override this.
+        """
+        results = []
+        for notification in notifications:
+            try:
+                self.send(notification.message, notification.recipient)
+                results.append(None)
+            except Exception as error:
+                results.append(error)
+        return results
+
 class EmailSender(NotificationSender):
-    def send(self, message: str):
+    def send(self, message: str, recipient: str | None = None):
         print(f"Sending email: {message}")
 
 class SMSSender(NotificationSender):
-    def send(self, message: str):
+    def send(self, message: str, recipient: str | None = None):
         print(f"Sending SMS: {message}")
 
+class SMTPEmailSender(NotificationSender):
+    """Sends email over SMTP. A batch shares one SMTP session instead of connecting once per message."""
+    def __init__(self, host: str, port: int, from_address: str, default_recipient: str | None = None, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.from_address = from_address
+        self.default_recipient = default_recipient
+        self.timeout = timeout
+
+    def send(self, message: str, recipient: str | None = None):
+        (error,) = self.send_batch([Notification(message, recipient)])
+        if error is not None:
+            raise error
+
+    def send_batch(self, notifications: list[Notification]) -> list[Exception | None]:
+        try:
+            session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except OSError as error:
+            return [error] * len(notifications)
+        results: list[Exception | None] = [None] * len(notifications)
+        try:
+            for index, notification in enumerate(notifications):
+                try:
+                    session.send_message(self._email(notification))
+                except (ValueError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as error:
+                    # Only this message was refused; the session carries on with the next one
+                    results[index] = error
+                except OSError as error:
+                    # The connection is gone: this message and every later one were not sent
+                    results[index:] = [error] * (len(notifications) - index)
+                    break
+        finally:
+            try:
+                session.quit()
+            except OSError:
+                session.close()
+        return results
+
+    def _email(self, notification: Notification) -> EmailMessage:
+        recipient = notification.recipient or self.default_recipient
+        if recipient is None:
+            raise ValueError("Email notification has no recipient")
+        email = EmailMessage()
+        email["From"] = self.from_address
+        email["To"] = recipient
+        email["Subject"] = "Notification"
+        email.set_content(notification.message)
+        return email
+
 class NotificationService:
     def __init__(self, notification_sender: NotificationSender):
         self.notification_sender = notification_sender
 
-    def send_notification(self, message: str):
-        self.notification_sender.send(message)
+    def send_notification(self, message: str, recipient: str | None = None):
+        self.notification_sender.send(message, recipient)
+
+# Asynchronous service - queued messages are delivered in per-sender batches, to several senders at once
+@dataclass
+class SenderStats:
+    sent: int = 0
+    failed: int = 0
+    batches: int = 0
+    errors: list[Exception] = field(default_factory=list)
+
+class AsyncNotificationService:
+    """Queues notifications and delivers them through several senders concurrently.
+
+    Every sender has its own bounded queue: notify() waits while a queue is full, so producers slow down
+    to the rate the senders keep up with. A consumer per sender groups whatever is queued (up to batch_size)
+    into one send_batch() call, run in a worker thread, with at most max_concurrency batches in flight per sender.
+    """
+    def __init__(self, senders: dict[str, NotificationSender], max_queue_size: int = 10_000,
+                 batch_size: int = 100, max_concurrency: int = 4):
+        self.senders = senders
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+        self.max_concurrency = max_concurrency
+        self.stats = {name: SenderStats() for name in senders}
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._consumers: list[asyncio.Task] = []
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def start(self):
+        for name, sender in self.senders.items():
+            queue = self._queues[name] = asyncio.Queue(self.max_queue_size)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._consumers.append(asyncio.create_task(self._consume(name, sender, queue, semaphore)))
+
+    async def notify(self, message: str, recipient: str | None = None, channels: Iterable[str] | None = None):
+        """Queue a message for the given channels (all senders by default)."""
+        notification = Notification(message, recipient)
+        for name in self.senders if channels is None else channels:
+            await self._queues[name].put(notification)
+
+    async def notify_many(self, notifications: Iterable[Notification], channels: Iterable[str] | None = None):
+        channels = list(self.senders if channels is None else channels)
+        for notification in notifications:
+            for name in channels:
+                await self._queues[name].put(notification)
+
+    async def flush(self):
+        """Wait until every queued notification has been sent or has failed."""
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+
+    async def close(self):
+        await self.flush()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _consume(self, name: str, sender: NotificationSender, queue: asyncio.Queue, semaphore: asyncio.Semaphore):
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            await semaphore.acquire()
+            task = asyncio.create_task(self._deliver(name, sender, batch, queue, semaphore))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, name: str, sender: NotificationSender, batch: list[Notification],
+                       queue: asyncio.Queue, semaphore: asyncio.Semaphore):
+        stats = self.stats[name]
+        try:
+            results = await asyncio.to_thread(sender.send_batch, batch)
+        except Exception as error:
+            results = [error] * len(batch)
+        try:
+            errors = [error for error in results if error is not None]
+            stats.sent += len(batch) - len(errors)
+            stats.failed += len(errors)
+            stats.errors.extend(errors)
+        finally:
+            stats.batches += 1
+            semaphore.release()
+            for _ in batch:
+                queue.task_done()
+
+# Filtering decorator - duplicates and over-limit messages never reach the wrapped sender
+class RotatingBloomFilter:
+    """Probabilistic set of recently seen keys with bounded memory.
+
+    Two generations of bits are kept; every `window` seconds (or once the current generation holds
+    `capacity` keys) the older one is dropped, and after 2 * `window` idle seconds both are.
+    A key is remembered for at least `window` seconds while fewer than `capacity` keys are added per
+    window. Under heavier load memory stays bounded instead: a key is then remembered until at least
+    `capacity` newer keys have been added, which can be less than `window` seconds.
+    False positives happen at roughly `error_rate`.
+    """
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, window: float = 60.0):
+        self.capacity = capacity
+        self.window = window
+        self._size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._current = bytearray((self._size + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._rotated_at = time.monotonic()
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self._size for index in range(self._hash_count)]
+
+    def _rotate_if_due(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= 2 * self.window:
+            self._previous, self._current = bytearray(len(self._current)), bytearray(len(self._current))
+            self._count = 0
+            self._rotated_at = now
+        elif now - self._rotated_at >= self.window or self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(len(self._current))
+            self._count = 0
+            self._rotated_at = now
+
+    def __contains__(self, key: str) -> bool:
+        self._rotate_if_due()
+        positions = self._positions(key)
+        return (all(self._current[position >> 3] & (1 << (position & 7)) for position in positions)
+                or all(self._previous[position >> 3] & (1 << (position & 7)) for position in positions))
+
+    def add(self, key: str):
+        self._rotate_if_due()
+        for position in self._positions(key):
+            self._current[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        return self._tokens
+
+    def take(self, tokens: float = 1.0):
+        self._tokens -= tokens
+
+@dataclass
+class FilterStats:
+    sent: int = 0
+    suppressed: int = 0
+    throttled: int = 0
+
+class FilteredNotificationSender(NotificationSender):
+    """Wraps any NotificationSender and drops messages that should not go out.
+
+    A message identical to one sent within `duplicate_window` seconds (same channel, recipient and text),
+    or still being sent, is suppressed; a message whose send failed is not, so it can be retried. Otherwise it must get a token from its recipient's bucket and from the channel's bucket,
+    or it is throttled. Dropped messages are only counted in `stats`; they are not queued for later.
+    Recipient buckets are kept for the `max_recipients` most recently seen recipients.
+    """
+    def __init__(self, sender: NotificationSender, channel: str = "default",
+                 duplicate_window: float = 60.0, duplicate_capacity: int = 100_000,
+                 recipient_rate: float = 1.0, recipient_burst: float = 5.0,
+                 channel_rate: float = 1_000.0, channel_burst: float = 1_000.0,
+                 max_recipients: int = 100_000):
+        self.sender = sender
+        self.channel = channel
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.max_recipients = max_recipients
+        self.stats = FilterStats()
+        self._seen = RotatingBloomFilter(duplicate_capacity, window=duplicate_window)
+        self._sending: set[str] = set()
+        self._channel_bucket = TokenBucket(channel_rate, channel_burst)
+        self._recipient_buckets: OrderedDict[str | None, TokenBucket] = OrderedDict()
+        # send_batch() may run in several worker threads at once (AsyncNotificationService)
+        self._lock = threading.Lock()
+
+    def _recipient_bucket(self, recipient: str | None) -> TokenBucket:
+        bucket = self._recipient_buckets.get(recipient)
+        if bucket is None:
+            bucket = self._recipient_buckets[recipient] = TokenBucket(self.recipient_rate, self.recipient_burst)
+            if len(self._recipient_buckets) > self.max_recipients:
+                self._recipient_buckets.popitem(last=False)
+        else:
+            self._recipient_buckets.move_to_end(recipient)
+        return bucket
+
+    def _admit(self, notification: Notification) -> str | None:
+        """The notification's duplicate key if it may be sent now, otherwise None."""
+        key = f"{self.channel}\0{notification.recipient}\0{notification.message}"
+        with self._lock:
+            if key in self._sending or key in self._seen:
+                self.stats.suppressed += 1
+                return None
+            recipient_bucket = self._recipient_bucket(notification.recipient)
+            if recipient_bucket.available() < 1 or self._channel_bucket.available() < 1:
+                self.stats.throttled += 1
+                return None
+            recipient_bucket.take()
+            self._channel_bucket.take()
+            self._sending.add(key)
+            return key
+
+    def _finish(self, key: str, sent: bool):
+        # Only a message that actually went out counts as seen
+        with self._lock:
+            self._sending.discard(key)
+            if sent:
+                self._seen.add(key)
+                self.stats.sent += 1
+
+    def send(self, message: str, recipient: str | None = None):
+        key = self._admit(Notification(message, recipient))
+        if key is None:
+            return
+        sent = False
+        try:
+            self.sender.send(message, recipient)
+            sent = True
+        finally:
+            self._finish(key, sent)
+
+    def send_batch(self, notifications: list[Notification]) -> list[Exception | None]:
+        # Dropped notifications were handled on purpose, so they report no error
+        results: list[Exception | None] = [None] * len(notifications)
+        admitted = [(index, key) for index, notification in enumerate(notifications)
+                    if (key := self._admit(notification)) is not None]
+        if not admitted:
+            return results
+        try:
+            sent = self.sender.send_batch([notifications[index] for index, _ in admitted])
+        except Exception as error:
+            sent = [error] * len(admitted)
+        for (index, key), error in zip(admitted, sent):
+            results[index] = error
+            self._finish(key, error is None)
+        return results
+
+# Stand-in SMTP server on localhost, for exercising SMTPEmailSender without a real mail relay
+class LocalSMTPServer:
+    def __init__(self):
+        self.messages: list[tuple[str, list[str], str]] = []
+        self.refused_recipients: set[str] = set()
+        self.sessions = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with server._lock:
+                    server.sessions += 1
+                self._reply("220 localhost ready")
+                sender, recipients = None, []
+                while line := self.rfile.readline():
+                    command = line.decode().strip()
+                    verb = command[:4].upper()
+                    if verb in ("HELO", "EHLO"):
+                        self._reply("250 localhost")
+                    elif verb == "MAIL":
+                        sender, recipients = command.split(":", 1)[1].strip(), []
+                        self._reply("250 OK")
+                    elif verb == "RCPT":
+                        recipient = command.split(":", 1)[1].strip()
+                        if recipient.strip("<>") in server.refused_recipients:
+                            self._reply("550 No such user")
+                        else:
+                            recipients.append(recipient)
+                            self._reply("250 OK")
+                    elif verb == "DATA":
+                        self._reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                            lines.append(data.decode())
+                        with server._lock:
+                            server.messages.append((sender, recipients, "".join(lines)))
+                        self._reply("250 OK")
+                    elif verb == "QUIT":
+                        self._reply("221 Bye")
+                        return
+                    else:
+                        self._reply("250 OK")
+
+            def _reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode())
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class CountingSMSSender(NotificationSender):
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, message: str, recipient: str | None = None):
+        self.sent += 1
+
+async def run_campaign(count: int = 2_000):
+    smtp_server = LocalSMTPServer()
+    smtp_server.start()
+    host, port = smtp_server.address
+    email_sender = SMTPEmailSender(host, port, "news@example.com")
+    recipients = [f"user{index}@example.com" for index in range(count)]
+
+    started = time.perf_counter()
+    one_by_one = NotificationService(email_sender)
+    for recipient in recipients[:count // 10]:
+        one_by_one.send_notification("Spring sale", recipient)
+    per_message = (time.perf_counter() - started) / (count // 10)
+    sessions = smtp_server.sessions
+
+    sms_sender = CountingSMSSender()
+    started = time.perf_counter()
+    async with AsyncNotificationService({"email": email_sender, "sms": sms_sender}, max_queue_size=500) as service:
+        await service.notify_many(Notification("Spring sale", recipient) for recipient in recipients)
+    batched = (time.perf_counter() - started) / count
+    smtp_server.stop()
+
+    print(f"One by one: {per_message * 1e3:.2f} ms per email, {sessions} SMTP sessions for {count // 10} emails")
+    print(f"Batched: {batched * 1e3:.2f} ms per email, {smtp_server.sessions - sessions} SMTP sessions for {count} emails, "
+          f"{sms_sender.sent} SMS")
+    print({name: (stats.sent, stats.failed, stats.batches) for name, stats in service.stats.items()})
 
 if __name__ == "__main__":
     email_sender = EmailSender()
@@ -47,4 +467,15 @@ if __name__ == "__main__":
 
     sms_sender = SMSSender()
     notification_service = NotificationService(sms_sender)
-    notification_service.send_notification
+    notification_service.send_notification("Hello, World!")
+
+    # The same alert fired three times, then a burst to one recipient
+    filtered_sender = FilteredNotificationSender(CountingSMSSender(), channel="sms", recipient_burst=3)
+    filtered_service = NotificationService(filtered_sender)
+    for _ in range(3):
+        filtered_service.send_notification("Disk almost full", "+15550100")
+    for index in range(5):
+        filtered_service.send_notification(f"Order {index} shipped", "+15550101")
+    print(filtered_sender.stats)
+
+    asyncio.run(run_campaign())
@@ -4,6 +4,14 @@ that it does not use.
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntFlag
+from functools import cache
+import asyncio
+import inspect
+import time
+
 # Violation of the Interface Segregation Principle
 class SmartDevice(ABC):
     @abstractmethod
@@ -88,6 +96,155 @@ class SmartSpeaker(Switchable, VolumeControllable):
     def set_volume(self):
         print("Setting the volume")
 
+# Command bus - capabilities are worked out once per device class, commands run on many devices concurrently
+class Capability(IntFlag):
+    SWITCHABLE = 1
+    TEMPERATURE = 2
+    VOLUME = 4
+
+CAPABILITY_INTERFACES = {
+    Capability.SWITCHABLE: Switchable,
+    Capability.TEMPERATURE: TemperatureContrallable,
+    Capability.VOLUME: VolumeControllable,
+}
+
+COMMANDS = {
+    "turn_on": Capability.SWITCHABLE,
+    "turn_off": Capability.SWITCHABLE,
+    "set_temperature": Capability.TEMPERATURE,
+    "set_volume": Capability.VOLUME,
+}
+
+@cache
+def capabilities_of(device_class: type) -> Capability:
+    capabilities = Capability(0)
+    for capability, interface in CAPABILITY_INTERFACES.items():
+        if issubclass(device_class, interface):
+            capabilities |= capability
+    return capabilities
+
+@dataclass
+class CommandReport:
+    command: str
+    succeeded: list[int] = field(default_factory=list)
+    failed: dict[int, Exception] = field(default_factory=dict)
+    timed_out: list[int] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.failed) + len(self.timed_out)
+
+class DeviceCommandBus:
+    """Registered devices indexed by capability and location, with commands sent to every matching device at once.
+
+    A device's capabilities come from its class and are computed once per class. dispatch() runs the command
+    on all targets with at most max_concurrency in flight, each limited to `timeout` seconds, and reports the
+    outcome per device id. Async device methods are awaited; plain ones run on the bus's own pool of
+    max_concurrency threads, and their timeout starts when a thread picks the call up. A thread call that
+    times out is reported as such but cannot be interrupted, and keeps its thread until it returns.
+    close() shuts the thread pool down.
+    """
+    def __init__(self, max_concurrency: int = 100, timeout: float = 5.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._devices: dict[int, object] = {}
+        self._locations: dict[int, str] = {}
+        self._by_capability: dict[Capability, set[int]] = {capability: set() for capability in Capability}
+        self._by_location: dict[str, set[int]] = {}
+        self._next_id = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="device-command")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def register(self, device, location: str) -> int:
+        device_id = self._next_id
+        self._next_id += 1
+        self._devices[device_id] = device
+        self._locations[device_id] = location
+        for capability in capabilities_of(type(device)):
+            self._by_capability[capability].add(device_id)
+        self._by_location.setdefault(location, set()).add(device_id)
+        return device_id
+
+    def unregister(self, device_id: int):
+        device = self._devices.pop(device_id)
+        for capability in capabilities_of(type(device)):
+            self._by_capability[capability].discard(device_id)
+        self._by_location[self._locations.pop(device_id)].discard(device_id)
+
+    def device(self, device_id: int):
+        return self._devices[device_id]
+
+    def select(self, capability: Capability, location: str | None = None) -> set[int]:
+        """Ids of the devices that have every capability in `capability`, optionally only at one location."""
+        targets = set(self._devices) if location is None else set(self._by_location.get(location, ()))
+        for single in capability:
+            targets &= self._by_capability[single]
+        return targets
+
+    async def dispatch(self, command: str, *args, location: str | None = None, timeout: float | None = None) -> CommandReport:
+        try:
+            capability = COMMANDS[command]
+        except KeyError:
+            raise ValueError(f"Unknown command {command!r}") from None
+        timeout = self.timeout if timeout is None else timeout
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        report = CommandReport(command)
+        started = time.perf_counter()
+
+        async def run(device_id: int):
+            method = getattr(self._devices[device_id], command)
+            async with semaphore:
+                try:
+                    if inspect.iscoroutinefunction(method):
+                        await asyncio.wait_for(method(*args), timeout)
+                    else:
+                        await self._run_in_thread(method, args, timeout)
+                    report.succeeded.append(device_id)
+                except asyncio.TimeoutError:
+                    report.timed_out.append(device_id)
+                except Exception as error:
+                    report.failed[device_id] = error
+
+        await asyncio.gather(*(run(device_id) for device_id in self.select(capability, location)))
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    async def _run_in_thread(self, method, args: tuple, timeout: float):
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+
+        def call():
+            loop.call_soon_threadsafe(started.set)
+            return method(*args)
+
+        result = loop.run_in_executor(self._executor, call)
+        # Time spent waiting for a free thread does not count against the timeout
+        await started.wait()
+        return await asyncio.wait_for(result, timeout)
+
+    def run(self, command: str, *args, location: str | None = None, timeout: float | None = None) -> CommandReport:
+        return asyncio.run(self.dispatch(command, *args, location=location, timeout=timeout))
+
+# A networked device whose commands are round trips, as in a real fleet
+class SmartPlug(Switchable):
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.on = False
+
+    async def turn_on(self):
+        await asyncio.sleep(self.latency)
+        self.on = True
+
+    async def turn_off(self):
+        await asyncio.sleep(self.latency)
+        self.on = False
+
 # Usage
 if __name__ == "__main__":
     smart_thermostat = SmartThermoStat()
@@ -96,4 +253,15 @@ if __name__ == "__main__":
 
     smart_speaker = SmartSpeaker()
     smart_speaker.turn_on()
-    smart_speaker.set_volume()
\ No newline at end of file
+    smart_speaker.set_volume()
+
+    bus = DeviceCommandBus(max_concurrency=500, timeout=0.5)
+    bus.register(smart_thermostat, "Building A")
+    bus.register(smart_speaker, "Building B")
+    for index in range(2_000):
+        bus.register(SmartPlug(latency=1.0 if index == 0 else 0.05), "Building A" if index % 2 else "Building B")
+    report = bus.run("turn_off", location="Building B")
+    print(f"{report.command}: {len(report.succeeded)} ok, {len(report.failed)} failed, "
+          f"{len(report.timed_out)} timed out in {report.elapsed:.2f}s")
+    print(len(bus.select(Capability.SWITCHABLE | Capability.TEMPERATURE)), len(bus.run("set_volume").succeeded))
+    bus.close()
@@ -43,6 +43,22 @@ if __name__ == "__main__":
 
 ### Adhering to the Liskov Substitution Principle
 from abc import ABC, abstractmethod
+from array import array
+from contextlib import ExitStack
+from itertools import compress
+import glob
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # AccountBook falls back to the array module
+    np = None
 
 class BankAccount(ABC):
     def __init__(self, balance: float) -> None:
@@ -55,23 +71,494 @@ class BankAccount(ABC):
     def withdraw(self, amount: float):
         pass
 
+    def withdrawal_cost(self, amount: float) -> float:
+        """How much a withdrawal of amount takes off the balance."""
+        return amount
+
+    def can_withdraw(self, amount: float) -> bool:
+        return self.balance >= self.withdrawal_cost(amount)
+
 class SavingsAccount(BankAccount):
+    fee = 10
+
+    def withdrawal_cost(self, amount: float) -> float:
+        return amount + self.fee
+
     def withdraw(self, amount: float):
-        if self.balance >= amount + 10:
-            self.balance -= amount + 10
+        if self.can_withdraw(amount):
+            self.balance -= self.withdrawal_cost(amount)
         else:
             print("Insufficient balance")
 
 class CurrentAccount(BankAccount):
     def withdraw(self, amount: float):
-        if self.balance >= amount:
-            self.balance -= amount
+        if self.can_withdraw(amount):
+            self.balance -= self.withdrawal_cost(amount)
         else:
             print("Insufficient balance")
 
 def make_withdrawal(account: BankAccount, amount: float):
     account.withdraw(amount)
 
+# Durable account state - write-ahead journal plus snapshots
+class AccountJournal:
+    """Append-only journal of account events with snapshots, kept in one directory.
+
+    Events are fixed-width (sequence, account id, event, amount) records in segment files that are
+    memory-mapped on recovery. Appends are group-committed: a writer thread writes and fsyncs
+    everything queued since its last fsync in one go, and wait(sequence) returns once that record is on disk.
+    If a write or fsync fails the writer stops, and wait() and append() raise RuntimeError from then on.
+    A snapshot stores every balance as of a sequence number and starts a new segment, so recovery
+    loads the newest snapshot and replays only the journal written after it. Account ids must be integers.
+    """
+    RECORD = struct.Struct("<QqBd")
+    SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+    SNAPSHOT_RECORD = struct.Struct("<qBd")
+    SNAPSHOT_MAGIC = b"ACCTSNAP"
+
+    OPEN_CURRENT, OPEN_SAVINGS, DEPOSIT, WITHDRAW = range(4)
+    ACCOUNT_KINDS = {OPEN_CURRENT: CurrentAccount, OPEN_SAVINGS: SavingsAccount}
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.recovered_accounts, self._sequence = self._recover()
+        self._durable = self._sequence
+        self._queue: list[bytes] = []
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._closed = False
+        self._error: OSError | None = None
+        self._file = self._open_segment(self._sequence + 1)
+        self._writer = threading.Thread(target=self._write_batches, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def open_event(cls, account: BankAccount) -> int:
+        for event, kind in cls.ACCOUNT_KINDS.items():
+            if type(account) is kind:
+                return event
+        raise ValueError(f"Cannot journal accounts of type {type(account).__name__}")
+
+    def _path(self, prefix: str, sequence: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{prefix}-{sequence:020d}.{suffix}")
+
+    def _open_segment(self, first_sequence: int):
+        file = open(self._path("journal", first_sequence, "log"), "ab")
+        # Drop a half-written record left by a crash, so new records stay aligned
+        file.truncate(file.tell() - file.tell() % self.RECORD.size)
+        return file
+
+    def check(self, account_id: int, amount: float):
+        """Raise ValueError if the event cannot be journaled, so callers can check before changing anything."""
+        try:
+            self.RECORD.pack(0, account_id, 0, amount)
+        except struct.error as error:
+            raise ValueError(f"Cannot journal account {account_id!r} with amount {amount!r}: {error}") from None
+
+    def append(self, account_id: int, event: int, amount: float, wait: bool = True) -> int:
+        return self.append_many([(account_id, event, amount)], wait)
+
+    def append_many(self, records: list[tuple[int, int, float]], wait: bool = True) -> int:
+        """Append (account_id, event, amount) records as one write, so they reach the disk in the same fsync.
+        Returns the sequence of the last record.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Journal is closed")
+            self._raise_if_failed()
+            first = self._sequence + 1
+            self._queue.append(b"".join(self.RECORD.pack(sequence, account_id, event, amount)
+                                        for sequence, (account_id, event, amount) in enumerate(records, first)))
+            self._sequence += len(records)
+            sequence = self._sequence
+            self._cond.notify_all()
+        if wait:
+            self.wait(sequence)
+        return sequence
+
+    def wait(self, sequence: int):
+        with self._cond:
+            self._cond.wait_for(lambda: self._durable >= sequence or self._error is not None)
+            if self._durable < sequence:
+                self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError("Journal write failed; later events were not made durable") from self._error
+
+    def _write_batches(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                batch, self._queue = self._queue, []
+                last_sequence = self._sequence
+            try:
+                with self._file_lock:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            except OSError as error:
+                # Waiters must not block forever on records that will never reach the disk
+                with self._cond:
+                    self._error = error
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = last_sequence
+                self._cond.notify_all()
+
+    def snapshot(self, accounts: dict[int, BankAccount]):
+        """Write every balance as of the latest sequence and drop the journal it covers.
+        Must be called while no events are being appended (AccountLedger.snapshot ensures that).
+        """
+        sequence = self._sequence
+        self.wait(sequence)
+        path = self._path("snapshot", sequence, "snap")
+        with open(path + ".tmp", "wb") as file:
+            file.write(self.SNAPSHOT_HEADER.pack(self.SNAPSHOT_MAGIC, sequence, len(accounts)))
+            file.write(b"".join(self.SNAPSHOT_RECORD.pack(account_id, self.open_event(account), account.balance)
+                                for account_id, account in accounts.items()))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        with self._file_lock:
+            self._file.close()
+            self._file = self._open_segment(sequence + 1)
+        for old in glob.glob(os.path.join(self.directory, "*-*.*")):
+            if old.endswith((".log", ".snap")) and old != path and self._sequence_of(old) <= sequence:
+                os.remove(old)
+
+    @staticmethod
+    def _sequence_of(path: str) -> int:
+        return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+    def _recover(self) -> tuple[dict[int, BankAccount], int]:
+        accounts: dict[int, BankAccount] = {}
+        sequence = 0
+        snapshots = sorted(glob.glob(os.path.join(self.directory, "snapshot-*.snap")))
+        if snapshots:
+            with open(snapshots[-1], "rb") as file:
+                data = file.read()
+            magic, sequence, count = self.SNAPSHOT_HEADER.unpack_from(data)
+            if magic != self.SNAPSHOT_MAGIC:
+                raise ValueError(f"Not an account snapshot: {snapshots[-1]}")
+            records = memoryview(data)[self.SNAPSHOT_HEADER.size:self.SNAPSHOT_HEADER.size + count * self.SNAPSHOT_RECORD.size]
+            for account_id, event, balance in self.SNAPSHOT_RECORD.iter_unpack(records):
+                accounts[account_id] = self.ACCOUNT_KINDS[event](balance)
+
+        for segment in sorted(glob.glob(os.path.join(self.directory, "journal-*.log"))):
+            size = os.path.getsize(segment)
+            # A crash can leave half a record at the end of the last segment
+            size -= size % self.RECORD.size
+            if size == 0:
+                continue
+            with open(segment, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    for record_sequence, account_id, event, amount in self.RECORD.iter_unpack(view[:size]):
+                        if record_sequence <= sequence:
+                            continue
+                        sequence = record_sequence
+                        if event == self.DEPOSIT:
+                            accounts[account_id].balance += amount
+                        elif event == self.WITHDRAW:
+                            accounts[account_id].balance -= amount
+                        else:
+                            accounts[account_id] = self.ACCOUNT_KINDS[event](amount)
+        return accounts, sequence
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._file.close()
+
+# Thread-safe ledger over many accounts
+class AccountLedger:
+    """Deposits, withdrawals and transfers that are safe to call from many threads.
+
+    Every account id maps to one of `stripes` locks. Operations touching several accounts take
+    their stripes in ascending order, so concurrent transfers can never deadlock.
+    Withdrawals follow each account's own rules and return False instead of overdrawing.
+    Amounts must be positive (post_batch uses the sign for direction); anything else raises ValueError.
+    With a journal, every change is logged under its locks and each call returns once it is durable.
+    The records of one transfer_many or post_batch call are written together, so a crash keeps all or none of them.
+    """
+    def __init__(self, accounts: dict | None = None, stripes: int = 64, journal: AccountJournal | None = None):
+        self._accounts: dict = dict(accounts or {})
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._journal = journal
+
+    @classmethod
+    def recover(cls, journal: AccountJournal, stripes: int = 64) -> "AccountLedger":
+        return cls(journal.recovered_accounts, stripes, journal)
+
+    def _stripe(self, account_id) -> int:
+        return hash(account_id) % len(self._locks)
+
+    def _locked(self, account_ids) -> ExitStack:
+        stack = ExitStack()
+        for stripe in sorted({self._stripe(account_id) for account_id in account_ids}):
+            stack.enter_context(self._locks[stripe])
+        return stack
+
+    def _check_record(self, account_id, amount: float):
+        # Before any account changes, so an event the journal cannot store never changes memory either
+        if self._journal is not None:
+            self._journal.check(account_id, amount)
+
+    def _log(self, records: list[tuple]) -> int:
+        if self._journal is None or not records:
+            return 0
+        return self._journal.append_many(records, wait=False)
+
+    def _make_durable(self, sequence: int):
+        # Called after the locks are released, so other stripes keep going and share the same fsync
+        if self._journal is not None and sequence:
+            self._journal.wait(sequence)
+
+    def open_account(self, account_id, account: BankAccount):
+        with self._locked([account_id]):
+            if account_id in self._accounts:
+                raise ValueError(f"Account {account_id} already exists")
+            event = AccountJournal.open_event(account) if self._journal is not None else 0
+            self._check_record(account_id, account.balance)
+            self._accounts[account_id] = account
+            sequence = self._log([(account_id, event, account.balance)])
+        self._make_durable(sequence)
+
+    def account(self, account_id) -> BankAccount:
+        return self._accounts[account_id]
+
+    def balance(self, account_id) -> float:
+        with self._locked([account_id]):
+            return self._accounts[account_id].balance
+
+    # Both return the journal record of the change, for the caller to log; _withdraw returns None if refused
+    def _deposit(self, account_id, amount: float) -> tuple:
+        self._check_record(account_id, amount)
+        self._accounts[account_id].deposit(amount)
+        return (account_id, AccountJournal.DEPOSIT, amount)
+
+    def _withdraw(self, account_id, amount: float) -> tuple | None:
+        account = self._accounts[account_id]
+        if not account.can_withdraw(amount):
+            return None
+        cost = account.withdrawal_cost(amount)
+        self._check_record(account_id, cost)
+        account.withdraw(amount)
+        return (account_id, AccountJournal.WITHDRAW, cost)
+
+    @staticmethod
+    def _check_amount(amount: float):
+        if not amount > 0:
+            raise ValueError(f"Amount must be positive, got {amount}")
+
+    def deposit(self, account_id, amount: float):
+        self._check_amount(amount)
+        with self._locked([account_id]):
+            sequence = self._log([self._deposit(account_id, amount)])
+        self._make_durable(sequence)
+
+    def withdraw(self, account_id, amount: float) -> bool:
+        self._check_amount(amount)
+        with self._locked([account_id]):
+            record = self._withdraw(account_id, amount)
+            if record is None:
+                return False
+            sequence = self._log([record])
+        self._make_durable(sequence)
+        return True
+
+    def transfer(self, source_id, target_id, amount: float) -> bool:
+        return self.transfer_many([(source_id, target_id, amount)])
+
+    def transfer_many(self, transfers: list[tuple]) -> bool:
+        """Apply every (source_id, target_id, amount) transfer, or none of them.
+        Raises ValueError, before anything is applied, if an amount is not positive.
+        """
+        for _, _, amount in transfers:
+            self._check_amount(amount)
+        account_ids = {account_id for source_id, target_id, _ in transfers for account_id in (source_id, target_id)}
+        with self._locked(account_ids):
+            # Check the whole batch against projected balances before touching any account
+            projected = {}
+            for source_id, target_id, amount in transfers:
+                source = self._accounts[source_id]
+                balance = projected.get(source_id, source.balance)
+                if balance < source.withdrawal_cost(amount):
+                    return False
+                projected[source_id] = balance - source.withdrawal_cost(amount)
+                projected[target_id] = projected.get(target_id, self._accounts[target_id].balance) + amount
+                self._check_record(source_id, source.withdrawal_cost(amount))
+                self._check_record(target_id, amount)
+            records = []
+            for source_id, target_id, amount in transfers:
+                records.append(self._withdraw(source_id, amount))
+                records.append(self._deposit(target_id, amount))
+            sequence = self._log(records)
+        self._make_durable(sequence)
+        return True
+
+    def post_batch(self, postings: list[tuple]) -> list[bool]:
+        """Apply (account_id, amount) postings, positive to deposit and negative to withdraw.
+        The stripes of every posting are locked once for the whole batch, so its journal records are
+        logged together. Returns whether each posting was applied.
+        Raises ValueError, before anything is applied, if an amount is zero.
+        """
+        for account_id, amount in postings:
+            self._check_amount(abs(amount))
+            self._check_record(account_id, abs(amount))
+        results = [False] * len(postings)
+        records = []
+        with self._locked({account_id for account_id, _ in postings}):
+            for index, (account_id, amount) in enumerate(postings):
+                record = self._deposit(account_id, amount) if amount >= 0 else self._withdraw(account_id, -amount)
+                if record is not None:
+                    results[index] = True
+                    records.append(record)
+            sequence = self._log(records)
+        self._make_durable(sequence)
+        return results
+
+    def snapshot(self):
+        """Snapshot every balance into the journal, pausing postings while it is written."""
+        if self._journal is None:
+            raise RuntimeError("Ledger has no journal")
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            self._journal.snapshot(self._accounts)
+
+def benchmark_ledger(thread_counts=(1, 2, 4, 8), account_counts=(2, 1000), transfers_per_thread: int = 20_000,
+                     stripes: int = 64) -> dict[tuple[int, int], float]:
+    """Random transfers per second for each (threads, accounts) combination."""
+    results = {}
+    for account_count in account_counts:
+        for thread_count in thread_counts:
+            ledger = AccountLedger({account_id: CurrentAccount(1_000_000) for account_id in range(account_count)}, stripes)
+
+            def run(seed: int):
+                rng = random.Random(seed)
+                for _ in range(transfers_per_thread):
+                    source_id, target_id = rng.sample(range(account_count), 2)
+                    ledger.transfer(source_id, target_id, 1)
+
+            threads = [threading.Thread(target=run, args=(seed,)) for seed in range(thread_count)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            results[(thread_count, account_count)] = thread_count * transfers_per_thread / elapsed
+            assert sum(ledger.balance(account_id) for account_id in range(account_count)) == account_count * 1_000_000
+    return results
+
+# Columnar account book for nightly batch jobs
+class AccountBook:
+    """Balances and account kinds stored in parallel arrays, one entry per account.
+
+    Rules are applied to every account in one vectorized pass (NumPy when installed, the array
+    module otherwise), with the same results as calling the account objects one by one: a
+    withdrawal costs what the account's withdrawal_cost() says and is skipped, not applied,
+    when the balance does not cover it. Operations return which accounts were changed.
+    """
+    KINDS = (CurrentAccount, SavingsAccount)
+
+    def __init__(self, balances, kinds):
+        if len(balances) != len(kinds):
+            raise ValueError("balances and kinds must have the same length")
+        self.balances = array("d", balances)
+        self.kinds = array("b", kinds)
+        # Both account kinds charge amount + a fixed fee, so one fee per kind describes them
+        self._fees = [kind(0).withdrawal_cost(0) for kind in self.KINDS]
+
+    def __len__(self):
+        return len(self.balances)
+
+    @classmethod
+    def from_accounts(cls, accounts: list[BankAccount]) -> "AccountBook":
+        return cls([account.balance for account in accounts], [cls.KINDS.index(type(account)) for account in accounts])
+
+    def to_accounts(self) -> list[BankAccount]:
+        return [self.KINDS[kind](balance) for balance, kind in zip(self.balances, self.kinds)]
+
+    def _costs(self, amounts):
+        if np is not None:
+            return np.asarray(amounts, dtype=float) + np.asarray(self._fees)[np.asarray(self.kinds)]
+        fees = self._fees
+        return [amount + fees[kind] for amount, kind in zip(amounts, self.kinds)]
+
+    def _debit(self, costs) -> list[bool]:
+        if np is not None:
+            balances = np.asarray(self.balances)
+            applied = balances >= costs
+            np.subtract(balances, costs, out=balances, where=applied)
+            return applied.tolist()
+        applied = [balance >= cost for balance, cost in zip(self.balances, costs)]
+        self.balances = array("d", [balance - cost if ok else balance
+                                    for balance, cost, ok in zip(self.balances, costs, applied)])
+        return applied
+
+    def deposit(self, amounts):
+        """Deposit amounts[i] into account i."""
+        if np is not None:
+            np.add(np.asarray(self.balances), np.asarray(amounts, dtype=float), out=np.asarray(self.balances))
+        else:
+            self.balances = array("d", map(float.__add__, self.balances, map(float, amounts)))
+
+    def withdraw(self, amounts) -> list[bool]:
+        """Withdraw amounts[i] from account i, including each kind's fee."""
+        return self._debit(self._costs(amounts))
+
+    def charge_fee(self, fee: float, kind: type[BankAccount] | None = None) -> list[bool]:
+        """Take a flat fee from every account (or every account of one kind) whose balance covers it."""
+        code = None if kind is None else self.KINDS.index(kind)
+        costs = [fee if code is None or account_kind == code else 0.0 for account_kind in self.kinds]
+        applied = self._debit(costs)
+        return applied if code is None else [ok and account_kind == code for ok, account_kind in zip(applied, self.kinds)]
+
+    def apply_interest(self, rate: float, kind: type[BankAccount] | None = None):
+        """Deposit balance * rate into every account (or every account of one kind)."""
+        code = None if kind is None else self.KINDS.index(kind)
+        if np is not None:
+            balances = np.asarray(self.balances)
+            selected = True if code is None else np.asarray(self.kinds) == code
+            np.multiply(balances, 1 + rate, out=balances, where=selected)
+        else:
+            self.balances = array("d", [balance * (1 + rate) if code is None or account_kind == code else balance
+                                        for balance, account_kind in zip(self.balances, self.kinds)])
+
+    def accounts_of(self, kind: type[BankAccount]) -> list[int]:
+        code = self.KINDS.index(kind)
+        return list(compress(range(len(self.kinds)), (account_kind == code for account_kind in self.kinds)))
+
+def benchmark_account_book(count: int = 1_000_000) -> dict[str, float]:
+    """Seconds to withdraw from `count` accounts as objects and as an AccountBook."""
+    rng = random.Random(0)
+    balances = [rng.uniform(0, 200) for _ in range(count)]
+    kinds = [rng.randrange(2) for _ in range(count)]
+    amounts = [rng.uniform(0, 150) for _ in range(count)]
+
+    accounts = AccountBook(balances, kinds).to_accounts()
+    started = time.perf_counter()
+    for account, amount in zip(accounts, amounts):
+        if account.can_withdraw(amount):
+            account.withdraw(amount)
+    objects = time.perf_counter() - started
+
+    book = AccountBook(balances, kinds)
+    started = time.perf_counter()
+    book.withdraw(amounts)
+    columnar = time.perf_counter() - started
+
+    assert [account.balance for account in accounts] == book.balances.tolist()
+    return {"objects": objects, "account_book": columnar}
+
 if __name__ == "__main__":
     bank_account = CurrentAccount(100)
     make_withdrawal(bank_account, 50)
@@ -80,4 +567,28 @@ if __name__ == "__main__":
     savings_account = SavingsAccount(100)
     make_withdrawal(savings_account, 50) # This will work as expected, it's overriding the abstract withdraw method
     print(savings_account.balance)
+
+    ledger = AccountLedger({"alice": CurrentAccount(100), "bob": SavingsAccount(100)})
+    print(ledger.transfer("bob", "alice", 50), ledger.balance("alice"), ledger.balance("bob"))
+    print(ledger.transfer_many([("alice", "bob", 100), ("bob", "alice", 500)]), ledger.balance("alice"))
+
+    journal_directory = tempfile.mkdtemp()
+    journal = AccountJournal(journal_directory)
+    durable_ledger = AccountLedger.recover(journal)
+    durable_ledger.open_account(1, CurrentAccount(100))
+    durable_ledger.open_account(2, SavingsAccount(100))
+    durable_ledger.snapshot()
+    durable_ledger.transfer(2, 1, 30)
+    journal.close()
+    journal = AccountJournal(journal_directory)
+    recovered = AccountLedger.recover(journal)
+    print(recovered.balance(1), recovered.balance(2))
+    journal.close()
+
+    book = AccountBook.from_accounts([CurrentAccount(100), SavingsAccount(100), SavingsAccount(5)])
+    print(book.withdraw([50, 50, 50]), book.balances.tolist())
+    print({name: f"{seconds:.3f}s" for name, seconds in benchmark_account_book().items()})
+
+    for (thread_count, account_count), rate in benchmark_ledger().items():
+        print(f"{thread_count} threads, {account_count} accounts: {rate:,.0f} transfers/s")
     
\ No newline at end of file
@@ -8,12 +8,9 @@ class ShippingCostCalculator:
     If we want to add a new shipping method, we would need to modify the class.
     """
     def calculate(self, order):
-        if order.shipping_method == "ground":
-            return self.calculate_ground_shipping(order)
-        elif order.shipping_method == "air":
-            return self.calculate_air_shipping(order)
-        elif order.shipping_method == "ship":
-            return self.calculate_ship_shipping(order)
+        method = self._METHODS.get(order.shipping_method)
+        if method is not None:
+            return method(self, order)
     
     def calculate_ground_shipping(self, order):
         return 5 + (0.1 * order.total)
@@ -23,35 +20,80 @@ class ShippingCostCalculator:
     
     def calculate_ship_shipping(self, order):
         return 20 + (0.4 * order.total)
+
+    # Still a violation - a new method means editing this table
+    _METHODS = {
+        "ground": calculate_ground_shipping,
+        "air": calculate_air_shipping,
+        "ship": calculate_ship_shipping,
+    }
     
 
 # Adhering to the Open Closed Principle
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import repeat
+from operator import attrgetter
+import inspect
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # batch pricing falls back to the array module
+    np = None
 
 class ShippingCostCalculator(ABC):
     """This class adheres to the Open Closed Principle by being open for extension but closed for modification.
     If we want to add a new shipping method, we can create a new subclass without modifying the existing class.
+    Subclasses register themselves (pass register=False to opt out), so quote engines can find every method.
     """
+    registry: list[type["ShippingCostCalculator"]] = []
+
+    def __init_subclass__(cls, register: bool = True, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if register:
+            ShippingCostCalculator.registry.append(cls)
+
     @abstractmethod
     def calculate_cost(self, order):
         pass
 
-class GroundShippingCostCalculator(ShippingCostCalculator):
-    def calculate_cost(self, order):
-        return 5 + (0.1 * order.total)
+    def cost_model(self) -> tuple[float, float] | None:
+        """(base, rate) if the cost is always base + rate * order.total, otherwise None."""
+        return None
+
+class LinearShippingCostCalculator(ShippingCostCalculator, register=False):
+    """Cost is a fixed base plus a rate per unit of order total. Subclasses only set base and rate."""
+    base = 0
+    rate = 0
 
-class AirShippingCostCalculator(ShippingCostCalculator):
     def calculate_cost(self, order):
-        return 10 + (0.2 * order.total)
+        return self.base + (self.rate * order.total)
+
+    def cost_model(self) -> tuple[float, float] | None:
+        # A subclass that overrides calculate_cost is no longer described by base and rate
+        if type(self).calculate_cost is not LinearShippingCostCalculator.calculate_cost:
+            return None
+        return (self.base, self.rate)
+
+class GroundShippingCostCalculator(LinearShippingCostCalculator):
+    base = 5
+    rate = 0.1
+
+class AirShippingCostCalculator(LinearShippingCostCalculator):
+    base = 10
+    rate = 0.2
     
-class ShipShippingCostCalculator(ShippingCostCalculator):
-    def calculate_cost(self, order):
-        return 20 + (0.4 * order.total)
+class ShipShippingCostCalculator(LinearShippingCostCalculator):
+    base = 20
+    rate = 0.4
 
 # Adding a new shipping method without modifying the existing class
-class DroneShippingCostCalculator(ShippingCostCalculator):
-    def calculate_cost(self, order):
-        return 15 + (0.3 * order.total)
+class DroneShippingCostCalculator(LinearShippingCostCalculator):
+    base = 15
+    rate = 0.3
     
 class Order:
     def __init__(self, total, shipping_method):
@@ -60,6 +102,118 @@ class Order:
 
     def calculate_shipping_cost(self):
         return self.shipping_method.calculate_cost(self)
+
+# Batch pricing - linear calculators price a whole array of totals in one pass
+def calculate_costs(calculator: ShippingCostCalculator, totals):
+    """Cost for every order total, as a float array (a NumPy array when NumPy is installed).
+    Calculators without a linear cost model are called once per total.
+    """
+    model = calculator.cost_model()
+    if model is None:
+        costs = (calculator.calculate_cost(Order(total, calculator)) for total in totals)
+        return np.fromiter(costs, dtype=float) if np is not None else array("d", costs)
+    base, rate = model
+    if np is not None:
+        return base + rate * np.asarray(totals, dtype=float)
+    return array("d", map(operator.add, repeat(base), map(operator.mul, repeat(rate), totals)))
+
+def calculate_shipping_costs(orders) -> list[float]:
+    """Shipping cost of every order, in order.
+    With NumPy, orders are grouped by calculator class (so a cost_model() must depend only on the class)
+    and linear classes are priced from per-class base and rate tables in one pass. Orders on other
+    calculators, and every order when NumPy is missing, go through calculate_shipping_cost(): reading
+    the order attributes already costs about as much as the per-order call, so the array module cannot beat it.
+    """
+    orders = orders if isinstance(orders, list) else list(orders)
+    if np is None:
+        return list(map(Order.calculate_shipping_cost, orders))
+
+    classes = list(map(type, map(attrgetter("shipping_method"), orders)))
+    codes = {cls: code for code, cls in enumerate(set(classes))}
+    # one calculator per class is enough to read the class's cost model
+    models = [orders[classes.index(cls)].shipping_method.cost_model() for cls in codes]
+    if all(model is None for model in models):
+        return list(map(Order.calculate_shipping_cost, orders))
+
+    totals = np.fromiter(map(attrgetter("total"), orders), dtype=float, count=len(orders))
+    if len(models) == 1:
+        base, rate = models[0]
+        return (base + rate * totals).tolist()
+    class_codes = np.fromiter(map(codes.__getitem__, classes), dtype=np.intp, count=len(classes))
+    bases = np.array([model[0] if model else 0.0 for model in models])
+    rates = np.array([model[1] if model else 0.0 for model in models])
+    costs = (bases[class_codes] + rates[class_codes] * totals).tolist()
+    for code, model in enumerate(models):
+        if model is None:
+            for index in np.flatnonzero(class_codes == code).tolist():
+                costs[index] = orders[index].calculate_shipping_cost()
+    return costs
+
+# Cheapest-method quotes
+class ShippingQuoteEngine:
+    """Answers "which shipping method is cheapest for this order total, and what does it cost".
+
+    Registered calculators are instantiated once. The linear ones are compiled into their lower
+    envelope: the sorted totals at which the cheapest line changes, so a quote is one binary
+    search. Other calculators are evaluated per total behind a bounded LRU cache.
+    Order totals are assumed to be non-negative.
+    """
+    def __init__(self, calculators: list[ShippingCostCalculator] | None = None, cache_size: int = 1024):
+        if calculators is None:
+            # abstract intermediate classes are registered too but cannot be instantiated
+            calculators = [calculator_class() for calculator_class in ShippingCostCalculator.registry
+                           if not inspect.isabstract(calculator_class)]
+        lines = []
+        self._custom = []
+        for calculator in calculators:
+            model = calculator.cost_model()
+            if model is None:
+                self._custom.append(calculator)
+            else:
+                lines.append((calculator, *model))
+        self._breakpoints, self._segments = self._lower_envelope(lines)
+        self._cheapest_custom = lru_cache(maxsize=cache_size)(self._evaluate_custom)
+
+    @staticmethod
+    def _lower_envelope(lines: list[tuple]) -> tuple[list[float], list[tuple]]:
+        if not lines:
+            return [], []
+        # Cheapest at a total of 0; on a tie the flatter line stays cheapest afterwards
+        current = min(lines, key=lambda line: (line[1], line[2]))
+        x = 0.0
+        breakpoints, segments = [], [current]
+        while True:
+            _, base, rate = current
+            # Only a flatter line can take over, at the total where it crosses the current one
+            crossings = []
+            for line in lines:
+                _, other_base, other_rate = line
+                if other_rate < rate:
+                    crossing = (other_base - base) / (rate - other_rate)
+                    if crossing >= x:
+                        crossings.append((crossing, other_rate, line))
+            if not crossings:
+                return breakpoints, segments
+            x, _, current = min(crossings, key=lambda crossing: (crossing[0], crossing[1]))
+            breakpoints.append(x)
+            segments.append(current)
+
+    def _evaluate_custom(self, total: float) -> tuple[ShippingCostCalculator, float] | None:
+        quotes = [(calculator, calculator.calculate_cost(Order(total, calculator))) for calculator in self._custom]
+        return min(quotes, key=lambda quote: quote[1], default=None)
+
+    def quote(self, total: float) -> tuple[ShippingCostCalculator, float]:
+        best = None
+        if self._segments:
+            calculator, base, rate = self._segments[bisect_right(self._breakpoints, total)]
+            best = (calculator, base + (rate * total))
+        if self._custom:
+            custom = self._cheapest_custom(total)
+            if best is None or custom[1] < best[1]:
+                best = custom
+        if best is None:
+            raise ValueError("No shipping methods to quote")
+        return best
     
 # Usage
 if __name__ == "__main__":
@@ -73,4 +227,19 @@ if __name__ == "__main__":
     print(order.calculate_shipping_cost())
     
     order = Order(total=100, shipping_method=DroneShippingCostCalculator())
-    print(order.calculate_shipping_cost())
\ No newline at end of file
+    print(order.calculate_shipping_cost())
+
+    ground = GroundShippingCostCalculator()
+    orders = [Order(total=total, shipping_method=ground) for total in (50, 100, 150)]
+    orders.append(Order(total=100, shipping_method=AirShippingCostCalculator()))
+    print(calculate_shipping_costs(orders))
+
+    # Freight is expensive up front but cheapest for large orders
+    class FreightShippingCostCalculator(LinearShippingCostCalculator):
+        base = 40
+        rate = 0.02
+
+    quote_engine = ShippingQuoteEngine()
+    for total in (100, 1000):
+        calculator, cost = quote_engine.quote(total)
+        print(f"Cheapest for {total}: {type(calculator).__name__} at {cost}")
\ No newline at end of file
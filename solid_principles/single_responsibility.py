@@ -30,22 +30,126 @@ class Order:
     
 
 # adhering to the Single Responsibility Principle
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from itertools import islice
+from typing import NamedTuple
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+def item_field(item, name: str):
+    """Items may be dicts (as in the usage example) or objects with attributes."""
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+def item_price(item) -> Decimal:
+    price = item_field(item, "price")
+    return price if isinstance(price, Decimal) else Decimal(str(price))
+
+class OrderItemStore:
+    """This class has the responsibility of storing the order lines.
+    Lines are indexed by item id with a quantity, and the total is kept as an exact Decimal
+    that is updated on every change instead of being re-summed.
+    """
+    def __init__(self, items=()) -> None:
+        self._lines: dict = {}
+        self.total = Decimal(0)
+        self.add_items(items)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        """Yields (item, quantity) pairs in the order the items were first added."""
+        return (tuple(line) for line in self._lines.values())
+
+    def __contains__(self, item_id):
+        return item_id in self._lines
+
+    def quantity(self, item_id) -> int:
+        line = self._lines.get(item_id)
+        return line[1] if line else 0
+
+    def add_item(self, item, quantity: int = 1):
+        if quantity <= 0:
+            raise ValueError("quantity must be positive")
+        item_id = item_field(item, "id")
+        price = item_price(item)
+        line = self._lines.get(item_id)
+        if line is None:
+            self._lines[item_id] = [item, quantity]
+        elif item_price(line[0]) != price:
+            raise ValueError(f"Item {item_id} is already in the order at a different price")
+        else:
+            line[1] += quantity
+        self.total += price * quantity
+
+    def remove_item(self, item, quantity: int = 1):
+        if quantity <= 0:
+            raise ValueError("quantity must be positive")
+        item_id = item_field(item, "id")
+        self.update_quantity(item_id, self.quantity(item_id) - quantity)
+
+    def update_quantity(self, item_id, quantity: int):
+        line = self._lines.get(item_id)
+        if line is None:
+            raise ValueError(f"Item {item_id} is not in the order")
+        if quantity < 0:
+            raise ValueError(f"Cannot remove more of item {item_id} than the order holds")
+        self.total += item_price(line[0]) * (quantity - line[1])
+        if quantity == 0:
+            del self._lines[item_id]
+        else:
+            line[1] = quantity
+
+    def add_items(self, items):
+        """Add one of each given item. Nothing is added if any item conflicts with the order or the batch."""
+        items_by_id = {}
+        counts = Counter()
+        for item in items:
+            item_id = item_field(item, "id")
+            price = item_price(item)
+            if item_price(items_by_id.setdefault(item_id, item)) != price:
+                raise ValueError(f"Item {item_id} is listed more than once at different prices")
+            line = self._lines.get(item_id)
+            if line is not None and item_price(line[0]) != price:
+                raise ValueError(f"Item {item_id} is already in the order at a different price")
+            counts[item_id] += 1
+        for item_id, quantity in counts.items():
+            self.add_item(items_by_id[item_id], quantity)
+
+    def remove_items(self, items):
+        """Remove one of each given item. Nothing is removed if any of them is missing."""
+        counts = Counter(item_field(item, "id") for item in items)
+        for item_id, quantity in counts.items():
+            if self.quantity(item_id) < quantity:
+                raise ValueError(f"Cannot remove {quantity} of item {item_id}, the order holds {self.quantity(item_id)}")
+        for item_id, quantity in counts.items():
+            self.update_quantity(item_id, self.quantity(item_id) - quantity)
+
 class Order:
     """This class adheres to the Single Responsibility Principle by having only one reason to change.
     It has the responsibility of managing the order details.
     """
     def __init__(self, customer_id, items) -> None:
         self.customer_id = customer_id
-        self.items = items
-        self.total = sum(item.price for item in items)
+        self.items = OrderItemStore(items)
 
-    def add_item(self, item):
-        self.items.append(item)
-        self.total += item.price
+    @property
+    def total(self) -> Decimal:
+        return self.items.total
 
-    def remove_item(self, item):
-        self.items.remove(item)
-        self.total -= item.price
+    def add_item(self, item, quantity: int = 1):
+        self.items.add_item(item, quantity)
+
+    def remove_item(self, item, quantity: int = 1):
+        self.items.remove_item(item, quantity)
 
 class PaymentProcessor:
     """This class adheres to the Single Responsibility Principle by having only one reason to change.
@@ -54,6 +158,140 @@ class PaymentProcessor:
     def process_payment(self, order, amount):
         print(f"Processing payment of ${amount} for order with total ${order.total}")
 
+    def process_payments(self, payments: list[tuple]) -> list[Exception | None]:
+        """Process a batch of (order, amount) payments. Returns one result per payment: None if it
+        was processed, otherwise the error it failed with.
+        """
+        results = []
+        for order, amount in payments:
+            try:
+                self.process_payment(order, amount)
+            except Exception as error:
+                results.append(error)
+            else:
+                results.append(None)
+        return results
+
+# Settlement - one charge per customer per window instead of one per order
+class CustomerCharge:
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.orders = []
+        self.keys = []
+        self.total = Decimal(0)
+
+    def add(self, order, idempotency_key=None):
+        self.orders.append(order)
+        if idempotency_key is not None:
+            self.keys.append(idempotency_key)
+        self.total += order.total
+
+class SettlementReport:
+    def __init__(self):
+        self.settled: list[CustomerCharge] = []
+        self.failed: list[tuple[CustomerCharge, Exception]] = []
+        self.duplicates = 0
+
+    @property
+    def settled_amount(self) -> Decimal:
+        return sum((charge.total for charge in self.settled), Decimal(0))
+
+    @property
+    def orders_settled(self) -> int:
+        return sum(len(charge.orders) for charge in self.settled)
+
+    def __str__(self):
+        return (f"Settled {len(self.settled)} charges covering {self.orders_settled} orders for ${self.settled_amount}, "
+                f"{len(self.failed)} failed charges, {self.duplicates} duplicate orders skipped")
+
+class SettlementEngine:
+    """This class has the responsibility of settling orders in bulk.
+    Orders are grouped by customer_id into one CustomerCharge per window. A window is handed to
+    the processor as one batch once batch_size customers are pending or flush_interval seconds
+    have passed. Orders submitted with the idempotency key of an order that was settled, or is still
+    waiting to be, are skipped; the key of a failed charge is forgotten so the order can be resubmitted.
+    """
+    def __init__(self, payment_processor: PaymentProcessor, batch_size: int = 100, flush_interval: float = 1.0):
+        self.payment_processor = payment_processor
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.report = SettlementReport()
+        self._pending: dict = {}
+        self._seen_keys = set()
+        self._pending_keys = set()
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="settlement-flusher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, order, idempotency_key=None):
+        with self._lock:
+            if idempotency_key is not None:
+                if idempotency_key in self._seen_keys or idempotency_key in self._pending_keys:
+                    self.report.duplicates += 1
+                    return
+                self._pending_keys.add(idempotency_key)
+            if not self._pending:
+                # A window starts with its first charge, not when the previous one was taken
+                self._window_started = time.monotonic()
+            charge = self._pending.get(order.customer_id)
+            if charge is None:
+                charge = self._pending[order.customer_id] = CustomerCharge(order.customer_id)
+            charge.add(order, idempotency_key)
+            if len(self._pending) < self.batch_size and not self._window_expired():
+                return
+            batch = self._take_window()
+        self._charge(batch)
+
+    def settle(self, orders, key=None) -> SettlementReport:
+        """Submit every order (deduplicated by key(order) when a key function is given) and settle what is left."""
+        for order in orders:
+            self.submit(order, key(order) if key else None)
+        return self.close()
+
+    def flush(self):
+        with self._lock:
+            batch = self._take_window()
+        self._charge(batch)
+
+    def close(self) -> SettlementReport:
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        return self.report
+
+    def _window_expired(self) -> bool:
+        return time.monotonic() - self._window_started >= self.flush_interval
+
+    def _take_window(self) -> list[CustomerCharge]:
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._window_started = time.monotonic()
+        return batch
+
+    def _charge(self, batch: list[CustomerCharge]):
+        if not batch:
+            return
+        try:
+            results = self.payment_processor.process_payments([(charge, charge.total) for charge in batch])
+        except Exception as error:
+            results = [error] * len(batch)
+        with self._lock:
+            for charge, error in zip(batch, results):
+                self._pending_keys.difference_update(charge.keys)
+                if error is None:
+                    self._seen_keys.update(charge.keys)
+                    self.report.settled.append(charge)
+                else:
+                    self.report.failed.append((charge, error))
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                batch = self._take_window() if self._pending and self._window_expired() else []
+            self._charge(batch)
+
 class InvoiceGenerator:
     """This class adheres to the Single Responsibility Principle by having only one reason to change.
     It has the responsibility of generating the invoice.
@@ -63,11 +301,102 @@ class InvoiceGenerator:
         print(f"Customer ID: {order.customer_id}")
         print(f"Total: {order.total}")
 
+# Streaming invoices - rendered in chunks on a process pool and written in order to a buffered file
+class InvoiceFormat(ABC):
+    header = ""
+
+    @abstractmethod
+    def render_rows(self, rows: list[tuple]) -> str:
+        """Render (customer_id, total) rows into one block of text."""
+        pass
+
+class CSVInvoiceFormat(InvoiceFormat):
+    header = "customer_id,total\r\n"
+
+    def render_rows(self, rows: list[tuple]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+class JSONLinesInvoiceFormat(InvoiceFormat):
+    def render_rows(self, rows: list[tuple]) -> str:
+        # Totals are written as strings so they stay exact
+        return "".join(json.dumps({"customer_id": customer_id, "total": str(total)}) + "\n" for customer_id, total in rows)
+
+class TextInvoiceFormat(InvoiceFormat):
+    header = f"{'Customer ID':<20}{'Total':>16}\n"
+
+    def render_rows(self, rows: list[tuple]) -> str:
+        return "".join(f"{str(customer_id):<20}{total:>16.2f}\n" for customer_id, total in rows)
+
+class InvoiceRunStats(NamedTuple):
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+class StreamingInvoiceGenerator:
+    """This class has the responsibility of generating invoices for a stream of orders.
+    Orders are consumed lazily in chunks and at most a few chunks per process are in flight,
+    so memory stays flat however many orders there are. processes=0 renders in this process.
+    """
+    def __init__(self, invoice_format: InvoiceFormat, processes: int | None = None,
+                 chunk_size: int = 5000, buffer_size: int = 1 << 20):
+        self.invoice_format = invoice_format
+        self.processes = os.cpu_count() if processes is None else processes
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+
+    def _chunks(self, orders):
+        rows = ((order.customer_id, order.total) for order in orders)
+        while chunk := list(islice(rows, self.chunk_size)):
+            yield chunk
+
+    def generate_invoices(self, orders, output) -> InvoiceRunStats:
+        """Write invoices for `orders` to `output`, a path or an open text file."""
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "w", buffering=self.buffer_size, newline="") as file:
+                return self.generate_invoices(orders, file)
+
+        started = time.perf_counter()
+        rows = 0
+        output.write(self.invoice_format.header)
+        if self.processes == 0:
+            for chunk in self._chunks(orders):
+                output.write(self.invoice_format.render_rows(chunk))
+                rows += len(chunk)
+            return InvoiceRunStats(rows, time.perf_counter() - started)
+
+        with ProcessPoolExecutor(self.processes) as pool:
+            in_flight = deque()
+            for chunk in self._chunks(orders):
+                in_flight.append((len(chunk), pool.submit(self.invoice_format.render_rows, chunk)))
+                if len(in_flight) >= 2 * self.processes:
+                    count, rendered = in_flight.popleft()
+                    output.write(rendered.result())
+                    rows += count
+            for count, rendered in in_flight:
+                output.write(rendered.result())
+                rows += count
+        return InvoiceRunStats(rows, time.perf_counter() - started)
+
 # Usage
 if __name__ == "__main__":
-    order = Order(customer_id=1, items=[{"id": 2, "name": "item1", "price": 50}, {"id": 2, "name": "item2", "price": 100}])
+    order = Order(customer_id=1, items=[{"id": 1, "name": "item1", "price": 50}, {"id": 2, "name": "item2", "price": 100}])
     payment_processor = PaymentProcessor()
     invoice_generator = InvoiceGenerator()
 
     payment_processor.process_payment(order, order.total)
     invoice_generator.generate_invoice(order)
+
+    orders = (Order(customer_id=customer_id, items=[{"id": 1, "name": "item1", "price": 19.99}]) for customer_id in range(20_000))
+    invoice_path = os.path.join(tempfile.mkdtemp(), "invoices.csv")
+    stats = StreamingInvoiceGenerator(CSVInvoiceFormat(), processes=2).generate_invoices(orders, invoice_path)
+    print(f"Wrote {stats.rows} invoices at {stats.rows_per_second:.0f} rows/s")
+
+    settlement_engine = SettlementEngine(payment_processor, batch_size=10)
+    orders = [Order(customer_id=customer_id % 3, items=[{"id": 1, "name": "item1", "price": 25}]) for customer_id in range(9)]
+    orders.append(orders[0])
+    print(settlement_engine.settle(orders, key=id))